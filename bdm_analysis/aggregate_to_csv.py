@@ -1,7 +1,112 @@
+import numpy as np
 import pandas as pd
 import os
 
-def aggregate_to_csv(df):
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    csv_path = os.path.join(script_dir, 'csv', 'summary.csv')
-    df.to_csv(csv_path, index=False)
\ No newline at end of file
+def get_output_dir(brand=None, output_dir=None):
+    """
+    Directory of the CSV exports (bdm_analysis/csv/ unless another one is given),
+    partitioned as brand=<brand>/ when a brand is given.
+    """
+    if output_dir is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        output_dir = os.path.join(script_dir, 'csv')
+    if brand is not None:
+        output_dir = os.path.join(output_dir, f'brand={brand}')
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
+
+def aggregate_to_csv(df, brand=None, output_dir=None):
+    csv_path = os.path.join(get_output_dir(brand, output_dir), 'summary.csv')
+    df.to_csv(csv_path, index=False)
+    return True
+
+def build_star_schema(df):
+    """
+    Split the cleaned dataset into a fact table of integer-coded prices and
+    dimension tables for references, currencies and dates.
+
+    Prices are stored as integer cents (`price_local_cents`, `price_eur_cents`).
+    Every text value is stored once, in its dimension table.
+
+    Returns:
+        dict: Table name -> DataFrame
+    """
+    # Imported here: clean_data loads currency_converter, which other exports do not need
+    from bdm_analysis.clean_data import get_fallback_rates
+
+    dates = df['life_span_date'].dt.normalize()
+    reference_codes, references = pd.factorize(
+        pd.MultiIndex.from_arrays([df['reference_code'], df['collection']]), sort=True
+    )
+    currency_codes, currencies = pd.factorize(df['currency'], sort=True)
+
+    fact = pd.DataFrame({
+        'date_key': (dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day).astype('int32').to_numpy(),
+        'reference_key': reference_codes.astype('int32'),
+        'currency_key': currency_codes.astype('int16'),
+        'price_local_cents': np.round(df['price'].to_numpy(dtype=float) * 100).astype('int64'),
+        'price_eur_cents': np.round(df['price_eur'].to_numpy(dtype=float) * 100).astype('int64'),
+    })
+    # Sorted facts compress better and let Power BI skip row groups by date
+    fact = fact.sort_values(['date_key', 'reference_key', 'currency_key'], kind='stable').reset_index(drop=True)
+
+    dim_reference = pd.DataFrame({
+        'reference_key': np.arange(len(references), dtype='int32'),
+        'reference_code': references.get_level_values(0),
+        'collection': references.get_level_values(1),
+    })
+
+    fallback_rates = {'EUR': 1.0, **get_fallback_rates()}
+    observed_rates = (df['price_eur'] / df['price']).groupby(df['currency']).mean()
+    dim_currency = pd.DataFrame({
+        'currency_key': np.arange(len(currencies), dtype='int16'),
+        'currency': currencies,
+        'fallback_rate_eur': [fallback_rates.get(c, np.nan) for c in currencies],
+        'avg_observed_rate_eur': observed_rates.reindex(currencies).to_numpy(),
+    })
+
+    calendar = pd.DatetimeIndex(dates.drop_duplicates().sort_values())
+    dim_date = pd.DataFrame({
+        'date_key': (calendar.year * 10000 + calendar.month * 100 + calendar.day).astype('int32'),
+        'date': calendar,
+        'year': calendar.year.astype('int16'),
+        'quarter': calendar.quarter.astype('int8'),
+        'month': calendar.month.astype('int8'),
+        'week': calendar.isocalendar().week.to_numpy().astype('int8'),
+        'day': calendar.day.astype('int8'),
+    })
+
+    return {
+        'fact_price': fact,
+        'dim_reference': dim_reference,
+        'dim_currency': dim_currency,
+        'dim_date': dim_date,
+    }
+
+def export_star_schema(df, brand=None, output_dir=None, compression='zstd'):
+    """
+    Write the star schema as compressed Parquet files (read natively by Power BI)
+    into a star/ folder next to summary.csv.
+
+    Returns:
+        str: Directory of the exported tables
+    """
+    star_dir = os.path.join(get_output_dir(brand, output_dir), 'star')
+    os.makedirs(star_dir, exist_ok=True)
+    for name, table in build_star_schema(df).items():
+        table.to_parquet(os.path.join(star_dir, f'{name}.parquet'), index=False, compression=compression)
+    return star_dir
+
+def save_cross_brand_summary(brand_summaries, output_dir=None):
+    """
+    Merge the per-brand pipeline summaries into one cross-brand table.
+
+    Returns:
+        pd.DataFrame: One row per brand
+    """
+    summary = pd.DataFrame([s for s in brand_summaries if s is not None])
+    if summary.empty:
+        return summary
+    summary = summary.sort_values('brand').reset_index(drop=True)
+    summary.to_csv(os.path.join(get_output_dir(output_dir=output_dir), 'cross_brand_summary.csv'), index=False)
+    return summary
@@ -1,11 +1,26 @@
 import pandas as pd
 from typing import Dict, List
 
+MAIN_CURRENCIES = ['EUR', 'USD', 'GBP', 'CHF', 'JPY', 'SGD', 'CNY', 'AED']
+
+# Rules shared by every arbitrage implementation: prices outside the EUR
+# bounds are ignored, and a gap counts between these profit percentages
+MIN_PRICE_EUR = 1000
+MAX_PRICE_EUR = 100000
+MIN_PROFIT_PERCENTAGE = 1
+MAX_PROFIT_PERCENTAGE = 15
+
+ARBITRAGE_COLUMNS = [
+    'reference_code', 'buy_currency', 'buy_price', 'sell_currency',
+    'sell_price_local', 'sell_price_eur', 'exchange_rate',
+    'potential_profit_eur', 'profit_percentage', 'date', 'arbitrage_direction'
+]
+
 def calculate_arbitrage_opportunities(df: pd.DataFrame) -> pd.DataFrame:
     """
     Calculate arbitrage opportunities in both directions (EUR -> other currency and other currency -> EUR).
     """
-    main_currencies = ['EUR', 'USD', 'GBP', 'CHF', 'JPY', 'SGD', 'CNY', 'AED']
+    main_currencies = MAIN_CURRENCIES
     df = df[df['currency'].isin(main_currencies)].copy()
     
     results = []
@@ -21,7 +36,7 @@ def calculate_arbitrage_opportunities(df: pd.DataFrame) -> pd.DataFrame:
                 
             eur_price = eur_data.iloc[0]['price']
             
-            if eur_price < 1000 or eur_price > 100000:
+            if eur_price < MIN_PRICE_EUR or eur_price > MAX_PRICE_EUR:
                 continue
             
             for curr in main_currencies:
@@ -35,7 +50,7 @@ def calculate_arbitrage_opportunities(df: pd.DataFrame) -> pd.DataFrame:
                 curr_price = curr_data.iloc[0]['price']
                 curr_price_eur = curr_data.iloc[0]['price_eur']
                 
-                if curr_price_eur < 1000 or curr_price_eur > 100000:
+                if curr_price_eur < MIN_PRICE_EUR or curr_price_eur > MAX_PRICE_EUR:
                     continue
                 
                 exchange_rate = curr_price_eur / curr_price
@@ -44,7 +59,7 @@ def calculate_arbitrage_opportunities(df: pd.DataFrame) -> pd.DataFrame:
                     profit = curr_price_eur - eur_price
                     profit_percentage = (profit / eur_price) * 100
                     
-                    if 1 <= profit_percentage <= 15:
+                    if MIN_PROFIT_PERCENTAGE <= profit_percentage <= MAX_PROFIT_PERCENTAGE:
                         results.append({
                             'reference_code': reference,
                             'buy_currency': 'EUR',
@@ -63,7 +78,7 @@ def calculate_arbitrage_opportunities(df: pd.DataFrame) -> pd.DataFrame:
                     profit = eur_price - curr_price_eur
                     profit_percentage = (profit / curr_price_eur) * 100
                     
-                    if 1 <= profit_percentage <= 15:
+                    if MIN_PROFIT_PERCENTAGE <= profit_percentage <= MAX_PROFIT_PERCENTAGE:
                         results.append({
                             'reference_code': reference,
                             'buy_currency': curr,
@@ -141,15 +156,18 @@ def find_stable_arbitrage_pairs(df: pd.DataFrame,
     
     return sorted(currency_stats, key=lambda x: x['avg_profit_percentage'], reverse=True)
 
-def generate_arbitrage_report(df: pd.DataFrame) -> str:
+def generate_arbitrage_report(df: pd.DataFrame, opportunities: pd.DataFrame = None,
+                              brand: str = 'Panerai') -> str:
     """
     Generate a detailed report of arbitrage opportunities in both directions.
+    Pre-computed opportunities (e.g. from the DuckDB backend) can be passed in.
     """
-    opportunities = calculate_arbitrage_opportunities(df)
+    if opportunities is None:
+        opportunities = calculate_arbitrage_opportunities(df)
     if opportunities.empty:
         return "No arbitrage opportunities found."
         
-    report = ["PANERAI ARBITRAGE REPORT\n"]
+    report = [f"{brand.upper()} ARBITRAGE REPORT\n"]
     
     report.append("1. GENERAL OVERVIEW")
     report.append(f"Total opportunities: {len(opportunities)}")
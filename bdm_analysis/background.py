@@ -0,0 +1,74 @@
+import io
+import numpy as np
+import pandas as pd
+from bdm_analysis.arbitrage_analysis import MAIN_CURRENCIES, calculate_arbitrage_opportunities
+from bdm_analysis.shared_dataset import attach_dataset
+
+class BackgroundJob:
+    """
+    A computation split into batches submitted to an executor.
+    Results of finished batches can be read while the others run, and
+    cancel() drops the batches that have not started yet.
+    """
+
+    def __init__(self, executor, function, batches, key=None):
+        self.key = key
+        self.futures = [executor.submit(function, *batch) for batch in batches]
+
+    def cancel(self):
+        for future in self.futures:
+            future.cancel()
+
+    def finished(self):
+        return [future for future in self.futures if future.done() and not future.cancelled()]
+
+    def progress(self):
+        return len(self.finished()) / len(self.futures) if self.futures else 1.0
+
+    def done(self):
+        return all(future.done() for future in self.futures)
+
+    def results(self):
+        """
+        Results of the finished batches, in batch order.
+        """
+        return [future.result() for future in self.finished() if future.exception() is None]
+
+    def errors(self):
+        return [future.exception() for future in self.finished() if future.exception() is not None]
+
+def reference_batches(df, batch_size=20):
+    """
+    Reference codes with prices in the main currencies, in the order
+    calculate_arbitrage_opportunities visits them, in batches of `batch_size`.
+    """
+    references = df.loc[df['currency'].isin(MAIN_CURRENCIES), 'reference_code'].unique()
+    return np.array_split(references, max(1, -(-len(references) // batch_size)))
+
+def arbitrage_batch(path, references):
+    """
+    Arbitrage opportunities of some references of the shared dataset at `path`.
+    Concatenating the batches in order gives calculate_arbitrage_opportunities of the whole dataset.
+    """
+    df = attach_dataset(path)
+    return calculate_arbitrage_opportunities(df[df['reference_code'].isin(references)])
+
+def combine_opportunities(parts):
+    parts = [part for part in parts if not part.empty]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+
+def forecast_job(path, reference_code, currency, max_points=None):
+    """
+    Forecast of one reference in one currency of the shared dataset at `path`,
+    with its chart rendered in the worker.
+
+    Returns:
+        tuple: (ForecastResult or None, PNG bytes of the chart or None)
+    """
+    from bdm_analysis.predicting_algo import forecast_price, forecast_figure
+    result = forecast_price(attach_dataset(path), reference_code, currency)
+    if result is None:
+        return None, None
+    buffer = io.BytesIO()
+    forecast_figure(result, max_points).savefig(buffer, format='png')
+    return result, buffer.getvalue()
@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Sequence
+from bdm_analysis.arbitrage_analysis import MAIN_CURRENCIES, MAX_PRICE_EUR, MAX_PROFIT_PERCENTAGE, MIN_PRICE_EUR
+
+DEFAULT_THRESHOLDS = [1.0, 2.0, 3.0, 5.0, 8.0]
+DEFAULT_HOLDING_DAYS = [0, 7, 14, 30, 60, 90]
+# References whose pair arrays are held in memory at once by run_backtest_grid
+DEFAULT_CHUNK_SIZE = 50
+
+def build_price_cube(df: pd.DataFrame, currencies: Sequence[str] = MAIN_CURRENCIES,
+                     max_price_age: int = 30) -> Dict:
+    """
+    Reshape the cleaned frame into dense (reference, currency, day) arrays of EUR prices.
+
+    `observed` only holds prices seen on that day (first row per day, as in
+    calculate_arbitrage_opportunities). `filled` carries the last price forward
+    for up to `max_price_age` days and is used to value exits.
+    """
+    currencies = list(currencies)
+    data = df[df['currency'].isin(currencies)]
+    dates = pd.to_datetime(data['life_span_date']).dt.normalize()
+    first_prices = data.assign(day=dates).groupby(
+        ['reference_code', 'currency', 'day'], sort=False
+    )['price_eur'].first()
+
+    references = np.sort(first_prices.index.get_level_values('reference_code').unique())
+    calendar = pd.date_range(dates.min(), dates.max(), freq='D')
+
+    ref_idx = pd.Index(references).get_indexer(first_prices.index.get_level_values('reference_code'))
+    curr_idx = pd.Index(currencies).get_indexer(first_prices.index.get_level_values('currency'))
+    day_idx = calendar.get_indexer(first_prices.index.get_level_values('day'))
+
+    observed = np.full((len(references), len(currencies), len(calendar)), np.nan)
+    observed[ref_idx, curr_idx, day_idx] = first_prices.to_numpy(dtype=float)
+
+    # Forward fill along the day axis without a Python loop
+    days = np.arange(len(calendar))
+    last_seen = np.where(~np.isnan(observed), days, -1)
+    np.maximum.accumulate(last_seen, axis=-1, out=last_seen)
+    filled = np.take_along_axis(observed, np.maximum(last_seen, 0), axis=-1)
+    filled[(last_seen < 0) | (days - last_seen > max_price_age)] = np.nan
+
+    return {
+        'references': references,
+        'currencies': currencies,
+        'calendar': calendar,
+        'observed': observed,
+        'filled': filled
+    }
+
+def _currency_pairs(currencies: List[str]) -> pd.DataFrame:
+    """
+    Buy/sell currency pairs allowed by the arbitrage rules: EUR against each foreign currency, both ways.
+    """
+    eur = currencies.index('EUR')
+    pairs = []
+    for i, curr in enumerate(currencies):
+        if curr == 'EUR':
+            continue
+        pairs.append({'buy': eur, 'sell': i, 'foreign': curr, 'arbitrage_direction': 'EUR->Foreign'})
+        pairs.append({'buy': i, 'sell': eur, 'foreign': curr, 'arbitrage_direction': 'Foreign->EUR'})
+    return pd.DataFrame(pairs)
+
+def _in_bounds(prices: np.ndarray) -> np.ndarray:
+    return (prices >= MIN_PRICE_EUR) & (prices <= MAX_PRICE_EUR)
+
+def _pair_arrays(cube: Dict, holding_days: Sequence[int]):
+    """
+    Entry signals and realized exits for every pair and holding window.
+
+    Returns:
+        tuple: (pairs, buy price, entry profit %, exit sell price per holding window)
+        with arrays shaped (pair, reference * day) and (holding, pair, reference * day).
+    """
+    pairs = _currency_pairs(cube['currencies'])
+    observed, filled = cube['observed'], cube['filled']
+    n_days = observed.shape[-1]
+
+    buy = observed[:, pairs['buy'], :]
+    sell_now = observed[:, pairs['sell'], :]
+    entry_ok = _in_bounds(buy) & _in_bounds(sell_now)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        entry_pct = np.where(entry_ok, (sell_now - buy) / buy * 100, np.nan)
+
+    # Exit price in the sell market `h` days after entry
+    exits = np.full((len(holding_days),) + buy.shape, np.nan)
+    sell_filled = filled[:, pairs['sell'], :]
+    for k, h in enumerate(holding_days):
+        if h < n_days:
+            exits[k, ..., :n_days - h] = sell_filled[..., h:]
+    exits[~_in_bounds(exits)] = np.nan
+
+    def flat(a):
+        # (..., reference, pair, day) -> (..., pair, reference * day)
+        a = np.moveaxis(a, -2, -3)
+        return a.reshape(a.shape[:-2] + (-1,))
+
+    return pairs, flat(buy), flat(entry_pct), flat(exits)
+
+def _reference_chunk(cube: Dict, start: int, stop: int) -> Dict:
+    """
+    The part of a price cube covering references start:stop.
+    """
+    return {
+        **cube,
+        'references': cube['references'][start:stop],
+        'observed': cube['observed'][start:stop],
+        'filled': cube['filled'][start:stop]
+    }
+
+def _pair_statistics(cube: Dict, thresholds: np.ndarray, holding_days: Sequence[int]) -> Dict:
+    """
+    Trade count, total profit, summed returns and wins of every (pair, threshold, holding window).
+    One batched matrix product per statistic covers the whole grid.
+    """
+    pairs, buy, entry_pct, exits = _pair_arrays(cube, holding_days)
+
+    # signals: (pair, threshold, reference * day)
+    signals = (entry_pct[:, None, :] >= thresholds[None, :, None]) & \
+              (entry_pct[:, None, :] <= MAX_PROFIT_PERCENTAGE)
+    signals = signals.astype(np.float64)
+
+    # per-trade outcomes: (pair, reference * day, holding)
+    closed = ~np.isnan(exits - buy[None])
+    profit = np.where(closed, exits - buy[None], 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = np.where(closed, profit / buy[None] * 100, 0.0)
+    outcomes = {
+        'n_trades': closed.astype(np.float64),
+        'total_profit_eur': profit,
+        'sum_return': returns,
+        'wins': (profit > 0).astype(np.float64)
+    }
+    # (pair, threshold, holding) for each statistic
+    return {
+        name: np.matmul(signals, np.moveaxis(values, 0, -1))
+        for name, values in outcomes.items()
+    }
+
+def run_backtest_grid(df: pd.DataFrame,
+                      thresholds: Sequence[float] = DEFAULT_THRESHOLDS,
+                      holding_days: Sequence[int] = DEFAULT_HOLDING_DAYS,
+                      currency_sets: Sequence[Sequence[str]] = None,
+                      max_price_age: int = 30,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Backtest the buy-in-one-market / sell-in-another strategy over a parameter grid.
+
+    A trade is opened on every day where a reference shows an arbitrage signal
+    between EUR and a foreign currency of the set (profit between the threshold
+    and 15%), buying at that day's price and selling `holding_days` later at the
+    last known price of the sell market. Positions may overlap.
+    The whole grid is evaluated with array operations, `chunk_size` references
+    at a time: every statistic is a sum over trades, so the results of the
+    chunks are added up and the per-trade arrays stay bounded in size.
+
+    Returns:
+        pd.DataFrame: One row per (threshold, holding window, currency set)
+    """
+    cube = build_price_cube(df, max_price_age=max_price_age)
+    if currency_sets is None:
+        foreign = [c for c in cube['currencies'] if c != 'EUR']
+        currency_sets = [[c] for c in foreign] + [foreign]
+
+    pairs = _currency_pairs(cube['currencies'])
+    thresholds = np.asarray(thresholds, dtype=float)
+    shape = (len(pairs), len(thresholds), len(holding_days))
+    per_pair = {name: np.zeros(shape) for name in ['n_trades', 'total_profit_eur', 'sum_return', 'wins']}
+    for start in range(0, len(cube['references']), chunk_size):
+        chunk = _reference_chunk(cube, start, start + chunk_size)
+        for name, values in _pair_statistics(chunk, thresholds, holding_days).items():
+            per_pair[name] += values
+
+    # Aggregate pairs into currency sets with a membership matrix
+    membership = np.array([pairs['foreign'].isin(s).to_numpy() for s in currency_sets], dtype=np.float64)
+    per_set = {name: np.einsum('sp,pkh->skh', membership, values) for name, values in per_pair.items()}
+
+    n_sets, n_thresholds, n_holdings = len(currency_sets), len(thresholds), len(holding_days)
+    grid = pd.DataFrame({
+        'min_profit_percentage': np.tile(np.repeat(thresholds, n_holdings), n_sets),
+        'holding_days': np.tile(np.asarray(holding_days), n_sets * n_thresholds),
+        'currencies': np.repeat([','.join(s) for s in currency_sets], n_thresholds * n_holdings),
+        **{name: values.reshape(-1) for name, values in per_set.items()}
+    })
+    grid['n_trades'] = grid['n_trades'].astype(int)
+    trades = grid['n_trades'].replace(0, np.nan)
+    grid['avg_profit_eur'] = grid['total_profit_eur'] / trades
+    grid['avg_return_percentage'] = grid.pop('sum_return') / trades
+    grid['win_rate'] = grid.pop('wins') / trades * 100
+
+    return grid.sort_values('total_profit_eur', ascending=False).reset_index(drop=True)
+
+def backtest_trades(df: pd.DataFrame, min_profit_percentage: float = 1.0,
+                    holding_days: int = 0, currencies: Sequence[str] = None,
+                    max_price_age: int = 30) -> pd.DataFrame:
+    """
+    List the individual trades of one backtest configuration.
+    """
+    cube = build_price_cube(df, max_price_age=max_price_age)
+    pairs, buy, entry_pct, exits = _pair_arrays(cube, [holding_days])
+    exits = exits[0]
+    if currencies is not None:
+        selected = pairs['foreign'].isin(currencies).to_numpy()
+    else:
+        selected = np.ones(len(pairs), dtype=bool)
+
+    taken = (entry_pct >= min_profit_percentage) & (entry_pct <= MAX_PROFIT_PERCENTAGE) & \
+            ~np.isnan(exits) & selected[:, None]
+    pair_idx, flat_idx = np.nonzero(taken)
+    ref_idx, day_idx = np.divmod(flat_idx, len(cube['calendar']))
+
+    currencies_all = np.asarray(cube['currencies'])
+    entry_dates = cube['calendar'][day_idx]
+    trades = pd.DataFrame({
+        'reference_code': cube['references'][ref_idx],
+        'buy_currency': currencies_all[pairs['buy'].to_numpy()[pair_idx]],
+        'sell_currency': currencies_all[pairs['sell'].to_numpy()[pair_idx]],
+        'entry_date': entry_dates,
+        'exit_date': entry_dates + pd.Timedelta(days=holding_days),
+        'buy_price_eur': buy[pair_idx, flat_idx],
+        'sell_price_eur': exits[pair_idx, flat_idx],
+        'entry_profit_percentage': entry_pct[pair_idx, flat_idx],
+        'arbitrage_direction': pairs['arbitrage_direction'].to_numpy()[pair_idx]
+    })
+    trades['profit_eur'] = trades['sell_price_eur'] - trades['buy_price_eur']
+    trades['return_percentage'] = trades['profit_eur'] / trades['buy_price_eur'] * 100
+    return trades.sort_values(['entry_date', 'reference_code']).reset_index(drop=True)
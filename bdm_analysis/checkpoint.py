@@ -0,0 +1,110 @@
+import hashlib
+import inspect
+import os
+import pickle
+import tempfile
+import pandas as pd
+
+def get_checkpoint_dir(checkpoint_dir=None):
+    """
+    Root directory of the stage checkpoints (bdm_analysis/.checkpoints unless another one is given).
+    """
+    if checkpoint_dir is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        checkpoint_dir = os.path.join(script_dir, '.checkpoints')
+    return checkpoint_dir
+
+def fingerprint_frame(df):
+    """
+    Content hash of a DataFrame: values, index, column names and dtypes.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr(list(df.columns)).encode())
+    digest.update(repr([str(dtype) for dtype in df.dtypes]).encode())
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    except TypeError:
+        # Unhashable cells (lists, dicts...): fall back to the pickled bytes
+        digest.update(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+    return digest.hexdigest()
+
+def fingerprint_file(path):
+    """
+    Hash of a file's path, size and modification time, for inputs that are
+    queried in place rather than loaded.
+    """
+    stat = os.stat(path)
+    return checkpoint_key('file', os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+def code_version(*modules):
+    """
+    Hash of the source code of the modules a stage depends on.
+    """
+    digest = hashlib.sha256()
+    for module in modules:
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()
+
+def checkpoint_key(stage, *parts):
+    """
+    Content-addressed key of a stage output, from its input fingerprints, code version and parameters.
+    """
+    digest = hashlib.sha256(stage.encode())
+    for part in parts:
+        digest.update(b'\0' + repr(part).encode())
+    return digest.hexdigest()
+
+def _checkpoint_path(stage, key, checkpoint_dir=None):
+    return os.path.join(get_checkpoint_dir(checkpoint_dir), stage, f'{key}.pkl')
+
+def load_checkpoint(stage, key, checkpoint_dir=None):
+    """
+    Load a stage output from its checkpoint.
+
+    Returns:
+        The stored object, or None if there is no valid checkpoint
+    """
+    path = _checkpoint_path(stage, key, checkpoint_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path)
+    except Exception as e:
+        print(f"Discarding invalid {stage} checkpoint: {e}")
+        os.remove(path)
+        return None
+
+def save_checkpoint(obj, stage, key, checkpoint_dir=None):
+    """
+    Store a stage output. The file is written to a temporary name and then
+    renamed, so an interrupted run never leaves a partial checkpoint behind.
+    """
+    path = _checkpoint_path(stage, key, checkpoint_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    return path
+
+def checkpointed(stage, key, compute, checkpoint_dir=None, enabled=True, refresh=False):
+    """
+    Return the checkpointed output of a stage, or compute and store it.
+    `refresh` recomputes the stage even if a checkpoint exists.
+    """
+    if not enabled:
+        return compute()
+    if not refresh:
+        result = load_checkpoint(stage, key, checkpoint_dir)
+        if result is not None:
+            print(f"\nResuming {stage} from checkpoint {key[:12]}")
+            return result
+    result = compute()
+    # Missing or empty outputs are not worth resuming from
+    if result is not None and not getattr(result, 'empty', False):
+        save_checkpoint(result, stage, key, checkpoint_dir)
+    return result
@@ -1,5 +1,12 @@
+import contextlib
+import io
+import os
+import multiprocessing
+import numpy as np
 import pandas as pd
 import datetime
+from concurrent.futures import ProcessPoolExecutor
+from pandas.tseries.api import guess_datetime_format
 from currency_converter import CurrencyConverter
 
 def get_fallback_rates():
@@ -76,18 +83,100 @@ def convert_prices_to_eur(df):
     df['price_eur'] = df.apply(convert_row, axis=1)
     
     # Display statistics by currency
-    print("\nConversion statistics by currency:")
-    for currency in df['currency'].unique():
-        currency_data = df[df['currency'] == currency]
-        success_rate = (currency_data['price_eur'].notna().sum() / len(currency_data)) * 100
-        print(f"{currency}: {success_rate:.1f}% success ({currency_data['price_eur'].notna().sum()}/{len(currency_data)})")
+    print_conversion_statistics(conversion_statistics(df))
     
     return df
 
-def clean_data(df):
+def conversion_statistics(df):
+    """
+    Number of converted and total prices per currency, in order of first appearance,
+    with the index label of that first row.
+    """
+    stats = df['price_eur'].notna().groupby(df['currency'], sort=False).agg(['sum', 'size'])
+    stats.columns = ['converted', 'total']
+    stats['first_row'] = df.index.to_series().groupby(df['currency'].to_numpy(), sort=False).first()
+    return stats
+
+def print_conversion_statistics(stats):
+    print("\nConversion statistics by currency:")
+    for currency, row in stats.iterrows():
+        success_rate = (row['converted'] / row['total']) * 100
+        print(f"{currency}: {success_rate:.1f}% success ({row['converted']}/{row['total']})")
+
+def flag_price_outliers(df, threshold=3.5, window=15, min_relative_spread=0.05, min_observations=3):
+    """
+    Flag prices far from the usual price of their (reference_code, currency) series.
+
+    Uses a rolling median and MAD (median absolute deviation) over a centred
+    window of `window` observations in date order, computed with grouped
+    rolling medians. A lasting price change soon holds the majority of the
+    window and is kept, while an isolated spike is flagged. The MAD is floored
+    at `min_relative_spread` of the median, so series whose price rarely
+    changes still tolerate normal price updates. Series with fewer than
+    `min_observations` prices are never flagged.
+
+    Returns:
+        pd.Series: True for outlier rows
+    """
+    # Positional index: the rolling results are realigned on it
+    prices = pd.DataFrame({
+        'reference_code': df['reference_code'].to_numpy(),
+        'currency': df['currency'].to_numpy(),
+        'price': df['price'].to_numpy(dtype=float),
+        'life_span_date': df['life_span_date'].to_numpy()
+    }).sort_values('life_span_date', kind='stable')
+    keys = [prices['reference_code'], prices['currency']]
+    rolling = {'window': window, 'center': True, 'min_periods': 1}
+
+    median = (prices['price'].groupby(keys, sort=False).rolling(**rolling).median()
+              .droplevel([0, 1]).reindex(prices.index))
+    deviation = (prices['price'] - median).abs()
+    mad = (deviation.groupby(keys, sort=False).rolling(**rolling).median()
+           .droplevel([0, 1]).reindex(prices.index))
+    # 1.4826 * MAD estimates the standard deviation of normally distributed prices
+    spread = 1.4826 * mad.clip(lower=min_relative_spread * median)
+    robust_z = deviation / spread
+    outliers = (robust_z > threshold) & (prices['price'].groupby(keys, sort=False).transform('size') >= min_observations)
+    return pd.Series(outliers.sort_index().to_numpy(), index=df.index)
+
+def clean_data(df, outlier_threshold=3.5, n_jobs=1):
     """
     Clean the dataset by applying basic filters and
     standardizing formats.
+    Set `outlier_threshold` to None (or 0) to keep per-series price outliers.
+    With `n_jobs` > 1 (or None for all cores) the work is split across
+    processes, see clean_data_parallel.
+    """
+    if n_jobs is None or n_jobs > 1:
+        return clean_data_parallel(df, outlier_threshold, n_jobs)
+    return _clean_steps(df, outlier_threshold)[0]
+
+def _kept_collections(df):
+    """
+    Rows whose collection is not a scraped URL (step 1 of the cleaning).
+    """
+    return ~df['collection'].str.contains('HTTPS:', na=False)
+
+# Date strings pandas skips when it infers a format from the first date
+SKIPPED_DATE_STRINGS = {'', 'NaT', 'nat', 'NAT', 'nan', 'NaN', 'NAN', 'now', 'today'}
+
+def _guess_date_format(dates):
+    """
+    Format pandas.to_datetime infers for `dates`: that of the first
+    non-missing value, if it is a string.
+    """
+    for value in dates:
+        if pd.isna(value) or (isinstance(value, str) and value in SKIPPED_DATE_STRINGS):
+            continue
+        return guess_datetime_format(value) if type(value) is str else None
+    return None
+
+def _clean_steps(df, outlier_threshold=3.5, date_format=None):
+    """
+    Cleaning steps of clean_data.
+
+    Returns:
+        tuple: (cleaned frame, conversion statistics by currency)
     """
     print("Starting data cleaning process...")
     
@@ -96,7 +185,7 @@ def clean_data(df):
     
     # 1. Cleaning collections
     print("1. Cleaning collections...")
-    df_clean = df_clean[~df_clean['collection'].str.contains('HTTPS:', na=False)]
+    df_clean = df_clean[_kept_collections(df_clean)]
     
     # 2. Standardizing fields
     print("2. Standardizing fields...")
@@ -106,7 +195,7 @@ def clean_data(df):
     
     # 3. Converting dates
     print("3. Converting dates...")
-    df_clean['life_span_date'] = pd.to_datetime(df_clean['life_span_date'], errors='coerce')
+    df_clean['life_span_date'] = pd.to_datetime(df_clean['life_span_date'], errors='coerce', format=date_format)
     
     # 4. Removing critical missing values
     print("4. Handling missing values...")
@@ -115,7 +204,12 @@ def clean_data(df):
     # 5. Cleaning prices
     print("5. Cleaning prices...")
     df_clean = df_clean[df_clean['price'] > 0]
+    if outlier_threshold:
+        outliers = flag_price_outliers(df_clean, threshold=outlier_threshold)
+        print(f"Removing {outliers.sum()} price outliers")
+        df_clean = df_clean[~outliers]
     df_clean = convert_prices_to_eur(df_clean)
+    stats = conversion_statistics(df_clean)
     df_clean = df_clean.dropna(subset=['price_eur'])
     
     # 6. Temporal columns
@@ -138,4 +232,86 @@ def clean_data(df):
     print(f"Rows removed: {rows_removed} ({rows_removed/initial_rows*100:.1f}%)")
     print(f"Final dataset: {final_rows} rows")
     
+    return df_clean, stats
+
+# Raw frame inherited by forked workers, so that partitions travel as row positions only
+_FORK_SOURCE = None
+
+def _clean_partition(partition, outlier_threshold, date_format):
+    """
+    Clean one partition (a DataFrame, or row positions in the inherited frame) without printing.
+    """
+    if isinstance(partition, np.ndarray):
+        partition = _FORK_SOURCE.iloc[partition]
+    with contextlib.redirect_stdout(io.StringIO()):
+        return _clean_steps(partition, outlier_threshold, date_format)
+
+def _partition_by_currency(df, n_partitions):
+    """
+    Row positions of up to `n_partitions` groups of currencies with balanced row counts.
+    A currency is never split, so per-(reference, currency) statistics stay exact.
+    """
+    keys = df['currency'].str.strip().str.upper().fillna('')
+    counts = keys.value_counts()
+    loads = np.zeros(n_partitions, dtype=int)
+    assignment = {}
+    for currency, count in counts.items():
+        target = int(np.argmin(loads))
+        assignment[currency] = target
+        loads[target] += count
+    labels = keys.map(assignment).to_numpy()
+    return [np.flatnonzero(labels == p) for p in range(n_partitions) if loads[p] > 0]
+
+def clean_data_parallel(df, outlier_threshold=3.5, n_jobs=None):
+    """
+    Same output as clean_data, computed on a process pool.
+
+    Rows are partitioned by currency and each partition is cleaned in its own
+    process. With the fork start method, workers inherit the raw frame and
+    only receive row positions. The cleaned partitions are put back in the
+    original row order, and the per-currency conversion statistics are merged.
+    """
+    global _FORK_SOURCE
+    n_jobs = n_jobs or os.cpu_count() or 1
+    print(f"Starting data cleaning process on {n_jobs} processes...")
+    initial_rows = len(df)
+
+    # Work on positions so the original order can be restored, even with a duplicated index
+    positioned = df.set_axis(pd.RangeIndex(initial_rows))
+    partitions = _partition_by_currency(positioned, n_jobs)
+
+    # The serial path infers the date format from the first date left after the collection filter
+    date_format = None
+    if not pd.api.types.is_datetime64_any_dtype(positioned['life_span_date']):
+        date_format = _guess_date_format(positioned.loc[_kept_collections(positioned), 'life_span_date'])
+
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        _FORK_SOURCE = positioned
+        tasks = partitions
+    else:
+        context = None
+        tasks = [positioned.iloc[positions] for positions in partitions]
+    try:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(tasks)), mp_context=context) as executor:
+            results = list(executor.map(
+                _clean_partition, tasks, [outlier_threshold] * len(tasks), [date_format] * len(tasks)
+            ))
+    finally:
+        _FORK_SOURCE = None
+
+    parts = [part for part, _ in results if not part.empty] or [results[0][0]]
+    df_clean = pd.concat(parts).sort_index()
+    df_clean.index = df.index[df_clean.index]
+
+    # Merge the conversion statistics, in order of first appearance like the serial path
+    stats = pd.concat([part_stats for _, part_stats in results]).sort_values('first_row')
+    print_conversion_statistics(stats)
+
+    final_rows = len(df_clean)
+    rows_removed = initial_rows - final_rows
+    print("\nCleaning completed!")
+    print(f"Rows removed: {rows_removed} ({rows_removed/initial_rows*100:.1f}%)")
+    print(f"Final dataset: {final_rows} rows")
+
     return df_clean
\ No newline at end of file
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+def _as_float(values):
+    """
+    Numeric view of a series, with dates as nanosecond timestamps.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.astype('int64').to_numpy(dtype=float)
+    return values.to_numpy(dtype=float)
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series sorted by x.
+
+    Keeps the first and last points, and one point per bucket in between:
+    the one forming the largest triangle with the previously kept point and
+    the average of the next bucket. Preserves the visual shape of the series.
+
+    Returns:
+        np.ndarray: Indices of the points to keep
+    """
+    x, y = _as_float(x), _as_float(y)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    selected = np.empty(n_out, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area)) if end > start else start
+        selected[i + 1] = a
+    return np.unique(selected)
+
+def minmax_buckets(x, y, n_buckets):
+    """
+    Bucketed min/max downsampling of a series sorted by x: keeps the lowest
+    and highest point of each of `n_buckets` equal-count buckets, so spikes survive.
+
+    Returns:
+        np.ndarray: Indices of the points to keep
+    """
+    y = _as_float(y)
+    n = len(y)
+    if 2 * n_buckets >= n:
+        return np.arange(n)
+
+    bucket = np.arange(n) * n_buckets // n
+    order = np.lexsort((y, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(n_buckets))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+def downsample_frame(df, x, y, max_points=1000, method='lttb'):
+    """
+    Reduce a DataFrame to at most about `max_points` rows for plotting,
+    sorted by `x`, so the chart payload does not grow with the history.
+    """
+    df = df.sort_values(x)
+    if len(df) <= max_points:
+        return df
+    if method == 'lttb':
+        keep = lttb(df[x], df[y], max_points)
+    elif method == 'minmax':
+        keep = minmax_buckets(df[x], df[y], max_points // 2)
+    else:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    return df.iloc[keep]
+
+def paginate(df, page, page_size):
+    """
+    Rows of a 1-based page of a DataFrame.
+
+    Returns:
+        tuple: (page rows, number of pages)
+    """
+    n_pages = max(1, -(-len(df) // page_size))
+    page = min(max(1, page), n_pages)
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size], n_pages
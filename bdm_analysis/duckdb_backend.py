@@ -0,0 +1,375 @@
+import os
+import tempfile
+from dataclasses import dataclass
+import duckdb
+import pandas as pd
+from bdm_analysis.arbitrage_analysis import (
+    ARBITRAGE_COLUMNS, MAIN_CURRENCIES, MAX_PRICE_EUR, MAX_PROFIT_PERCENTAGE, MIN_PRICE_EUR, MIN_PROFIT_PERCENTAGE
+)
+from bdm_analysis.load_data import save_snapshot
+
+PRICE_RANGE_LABELS = ['Entry Level', 'Mid Range', 'High End', 'Ultra Luxury']
+
+@dataclass(frozen=True)
+class ParquetSource:
+    """
+    A Parquet file, glob or list of files, restricted to a date range and a
+    reference set. The filters run in SQL, so DuckDB only reads the row
+    groups that can match.
+    """
+    path: object
+    start_date: str = None
+    end_date: str = None
+    references: tuple = None
+    brand: str = None
+
+def _sql_literal(value):
+    """
+    Quote a string (or a list of strings) as a DuckDB literal.
+    """
+    if isinstance(value, (list, tuple)):
+        return '[' + ', '.join(_sql_literal(v) for v in value) + ']'
+    return "'" + str(value).replace("'", "''") + "'"
+
+def write_parquet_snapshot(df, path=None, brand=None):
+    """
+    Save the cleaned dataset as a Parquet working snapshot the SQL backend can query.
+    Snapshots are partitioned as parquet/brand=<brand>/ when a brand is given.
+
+    Returns:
+        str: Path of the written file
+    """
+    if path is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        output_dir = os.path.join(script_dir, 'parquet')
+        if brand is not None:
+            output_dir = os.path.join(output_dir, f'brand={brand}')
+        # Not clean_data.parquet: that name is the snapshot stage output, often used as --input
+        path = os.path.join(output_dir, 'duckdb_snapshot.parquet')
+    return save_snapshot(df, path)
+
+def connect(threads=None, memory_limit=None, temp_directory=None):
+    """
+    Open an in-process DuckDB connection configured for multi-threaded
+    execution with spilling to disk.
+    """
+    con = duckdb.connect(database=':memory:')
+    con.execute(f"SET threads = {int(threads or os.cpu_count() or 1)}")
+    if memory_limit:
+        con.execute(f"SET memory_limit = {_sql_literal(memory_limit)}")
+    if temp_directory is None:
+        temp_directory = os.path.join(tempfile.gettempdir(), 'bdm_duckdb')
+    con.execute(f"SET temp_directory = {_sql_literal(temp_directory)}")
+    # Row order is tracked explicitly through file_row_number
+    con.execute("SET preserve_insertion_order = false")
+    return con
+
+def _source_filter(source):
+    """
+    WHERE clause of the filters of a ParquetSource (same rules as main.load_stage
+    and main.filter_data).
+    """
+    conditions = []
+    if source.start_date:
+        conditions.append(f"CAST(life_span_date AS TIMESTAMP) >= CAST({_sql_literal(source.start_date)} AS TIMESTAMP)")
+    if source.end_date:
+        conditions.append(f"CAST(life_span_date AS TIMESTAMP) <= CAST({_sql_literal(source.end_date)} AS TIMESTAMP)")
+    if source.references:
+        conditions.append(f"trim(reference_code) IN (SELECT unnest({_sql_literal(list(source.references))}))")
+    if source.brand:
+        conditions.append(f"brand = {_sql_literal(source.brand)}")
+    return f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+def _register_source(con, source):
+    """
+    Expose a Parquet file, glob or list of files (or a ParquetSource) as the `prices` view.
+    `_file` and `_row` keep the original row order of the snapshot.
+    """
+    where = ""
+    if isinstance(source, ParquetSource):
+        source, where = source.path, _source_filter(source)
+    con.execute(f"""
+        CREATE OR REPLACE VIEW prices AS
+        SELECT *, filename AS _file, file_row_number AS _row
+        FROM read_parquet({_sql_literal(source)}, filename = true, file_row_number = true)
+        {where}
+    """)
+
+def _query(source, sql, con=None):
+    """
+    Run a query against the `prices` view of the given source.
+    """
+    own_connection = con is None
+    if own_connection:
+        con = connect()
+    try:
+        _register_source(con, source)
+        return con.execute(sql).df()
+    finally:
+        if own_connection:
+            con.close()
+
+def count_rows(source, con=None):
+    """
+    Number of rows of the source, after its filters.
+    """
+    return int(_query(source, "SELECT count(*) AS n_rows FROM prices", con)['n_rows'].iloc[0])
+
+def verify_dataset_metrics(source, con=None):
+    """
+    Verify and display key dataset metrics.
+    """
+    counts = _query(source, """
+        SELECT count(DISTINCT reference_code) AS n_refs,
+               count(DISTINCT currency) AS n_currencies,
+               count(DISTINCT life_span_date) AS n_dates
+        FROM prices
+    """, con).iloc[0]
+    references = _query(source, """
+        SELECT reference_code FROM prices
+        GROUP BY reference_code ORDER BY min(_file), min(_row) LIMIT 5
+    """, con)
+    currencies = _query(source, """
+        SELECT currency FROM prices
+        GROUP BY currency ORDER BY min(_file), min(_row)
+    """, con)
+    dates = _query(source, """
+        SELECT DISTINCT life_span_date FROM prices
+        WHERE life_span_date IS NOT NULL ORDER BY life_span_date
+    """, con)
+
+    print("\nVerifying dataset metrics:")
+    print(f"\n1. Number of unique references: {counts['n_refs']}")
+    print("\nReference examples:")
+    print(references['reference_code'].values)
+    print(f"\n2. Number of unique currencies: {counts['n_currencies']}")
+    print("\nCurrencies present:")
+    print(currencies['currency'].values)
+    print(f"\n3. Number of unique dates: {counts['n_dates']}")
+    print("\nAvailable dates:")
+    print(sorted(dates['life_span_date'].values))
+
+    return {
+        'n_references': int(counts['n_refs']),
+        'n_currencies': int(counts['n_currencies']),
+        'n_dates': int(counts['n_dates'])
+    }
+
+def analyze_collections(source, con=None):
+    """
+    Statistical analysis by collection.
+    """
+    stats = _query(source, """
+        SELECT collection,
+               count(reference_code) AS model_count,
+               avg(price_eur) AS avg_price_eur,
+               min(price_eur) AS min_price_eur,
+               max(price_eur) AS max_price_eur,
+               stddev_samp(price_eur) AS price_std_eur
+        FROM prices
+        WHERE collection IS NOT NULL
+        GROUP BY collection
+        ORDER BY collection
+    """, con)
+    return stats.round(2)
+
+def analyze_price_ranges(source, con=None):
+    """
+    Price range segmentation.
+    """
+    ranges = _query(source, """
+        SELECT CASE
+                   WHEN price_eur <= 10000 THEN 0
+                   WHEN price_eur <= 25000 THEN 1
+                   WHEN price_eur <= 50000 THEN 2
+                   ELSE 3
+               END AS price_category,
+               count(reference_code) AS model_count,
+               count(DISTINCT reference_code) AS unique_references,
+               avg(price_eur) AS avg_price_eur,
+               count(DISTINCT collection) AS unique_collections
+        FROM prices
+        WHERE price_eur > 0
+        GROUP BY 1
+        ORDER BY 1
+    """, con)
+    ranges['price_category'] = pd.Categorical.from_codes(
+        ranges['price_category'], categories=PRICE_RANGE_LABELS, ordered=True
+    )
+    return ranges.round(2)
+
+def analyze_time_trends(source, con=None):
+    """
+    Temporal trend analysis.
+    """
+    trends = _query(source, """
+        SELECT date_trunc('quarter', life_span_date) AS year_quarter,
+               avg(price_eur) AS avg_price_eur,
+               count(price_eur) AS model_count,
+               count(DISTINCT reference_code) AS unique_references,
+               count(DISTINCT collection) AS unique_collections
+        FROM prices
+        WHERE life_span_date IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1
+    """, con)
+    trends = trends.round({'avg_price_eur': 2})
+    trends['year_quarter'] = pd.to_datetime(trends['year_quarter']).dt.to_period('Q')
+    return trends
+
+def create_price_reference_matrix(source, con=None):
+    """
+    Create a price reference matrix by currency.
+    """
+    first_prices = _query(source, """
+        SELECT reference_code, life_span_date, currency,
+               first(price ORDER BY _file, _row) AS price
+        FROM prices
+        WHERE price IS NOT NULL
+        GROUP BY ALL
+    """, con)
+    return first_prices.pivot(
+        index=['reference_code', 'life_span_date'],
+        columns='currency',
+        values='price'
+    ).reset_index()
+
+def analyze_currency_variations(source, con=None):
+    """
+    Analyze price variations between currencies.
+    """
+    latest = _query(source, """
+        WITH latest_prices AS (
+            SELECT reference_code,
+                   arg_max(price_eur, (life_span_date, _file, _row)) AS price_eur
+            FROM prices
+            WHERE price_eur IS NOT NULL AND life_span_date IS NOT NULL
+            GROUP BY reference_code
+        )
+        SELECT avg(price_eur) AS avg_eur_price,
+               min(price_eur) AS min_eur_price,
+               max(price_eur) AS max_eur_price,
+               stddev_samp(price_eur) AS price_std_eur,
+               count(*) AS total_references
+        FROM latest_prices
+    """, con).iloc[0]
+    overall = _query(source, """
+        SELECT count(DISTINCT currency) AS currencies_count,
+               min(life_span_date) AS min_date,
+               max(life_span_date) AS max_date
+        FROM prices
+    """, con).iloc[0]
+
+    return {
+        'avg_eur_price': latest['avg_eur_price'],
+        'min_eur_price': latest['min_eur_price'],
+        'max_eur_price': latest['max_eur_price'],
+        'price_std_eur': latest['price_std_eur'],
+        'total_references': int(latest['total_references']),
+        'currencies_count': int(overall['currencies_count']),
+        'date_range': f"{pd.Timestamp(overall['min_date'])} - {pd.Timestamp(overall['max_date'])}"
+    }
+
+def generate_summary_stats(source, con=None):
+    """
+    Generate global dataset statistics.
+    """
+    summary = _query(source, """
+        SELECT count(DISTINCT reference_code) AS total_models,
+               count(DISTINCT collection) AS total_collections,
+               avg(price_eur) AS avg_price_eur,
+               min(price_eur) AS min_price_eur,
+               max(price_eur) AS max_price_eur,
+               min(life_span_date) AS min_date,
+               max(life_span_date) AS max_date
+        FROM prices
+    """, con).iloc[0]
+    most_common = _query(source, """
+        SELECT collection FROM prices
+        WHERE collection IS NOT NULL
+        GROUP BY collection
+        ORDER BY count(*) DESC, collection
+        LIMIT 1
+    """, con)
+
+    return {
+        'total_models': int(summary['total_models']),
+        'total_collections': int(summary['total_collections']),
+        'avg_price_eur': summary['avg_price_eur'].round(2),
+        'price_range_eur': f"{summary['min_price_eur']:.2f} - {summary['max_price_eur']:.2f}",
+        'most_common_collection': most_common['collection'].iloc[0],
+        'date_range': f"{pd.Timestamp(summary['min_date'])} - {pd.Timestamp(summary['max_date'])}"
+    }
+
+def calculate_arbitrage_opportunities(source, con=None) -> pd.DataFrame:
+    """
+    Calculate arbitrage opportunities in both directions (EUR -> other currency and other currency -> EUR).
+    Same rules and row order as arbitrage_analysis.calculate_arbitrage_opportunities.
+    """
+    opportunities = _query(source, f"""
+        WITH base AS (
+            SELECT reference_code, life_span_date, currency, price, price_eur,
+                   row_number() OVER (ORDER BY _file, _row) AS _ord
+            FROM prices
+            WHERE currency IN (SELECT unnest({_sql_literal(MAIN_CURRENCIES)}))
+        ),
+        firsts AS (
+            SELECT reference_code, life_span_date, currency,
+                   first(price ORDER BY _ord) AS price,
+                   first(price_eur ORDER BY _ord) AS price_eur,
+                   min(_ord) AS _ord
+            FROM base
+            GROUP BY ALL
+        ),
+        ordered AS (
+            SELECT *,
+                   min(_ord) OVER (PARTITION BY reference_code) AS ref_ord,
+                   min(_ord) OVER (PARTITION BY reference_code, life_span_date) AS date_ord
+            FROM firsts
+        ),
+        pairs AS (
+            SELECT e.reference_code, e.life_span_date AS date,
+                   e.ref_ord, e.date_ord,
+                   list_position({_sql_literal(MAIN_CURRENCIES)}, o.currency) AS curr_ord,
+                   e.price AS eur_price,
+                   o.currency, o.price AS curr_price, o.price_eur AS curr_price_eur,
+                   o.price_eur / o.price AS exchange_rate
+            FROM ordered e
+            JOIN ordered o
+              ON o.reference_code = e.reference_code
+             AND o.life_span_date = e.life_span_date
+             AND o.currency <> 'EUR'
+            WHERE e.currency = 'EUR'
+              AND e.price BETWEEN {MIN_PRICE_EUR} AND {MAX_PRICE_EUR}
+              AND o.price_eur BETWEEN {MIN_PRICE_EUR} AND {MAX_PRICE_EUR}
+        ),
+        candidates AS (
+            SELECT reference_code, 'EUR' AS buy_currency, eur_price AS buy_price,
+                   currency AS sell_currency, curr_price AS sell_price_local,
+                   curr_price_eur AS sell_price_eur, exchange_rate,
+                   curr_price_eur - eur_price AS potential_profit_eur,
+                   ((curr_price_eur - eur_price) / eur_price) * 100 AS profit_percentage,
+                   date, 'EUR->Foreign' AS arbitrage_direction,
+                   ref_ord, date_ord, curr_ord
+            FROM pairs
+            WHERE curr_price_eur > eur_price
+            UNION ALL
+            SELECT reference_code, currency, curr_price,
+                   'EUR', eur_price, eur_price, exchange_rate,
+                   eur_price - curr_price_eur,
+                   ((eur_price - curr_price_eur) / curr_price_eur) * 100,
+                   date, 'Foreign->EUR',
+                   ref_ord, date_ord, curr_ord
+            FROM pairs
+            WHERE eur_price > curr_price_eur
+        )
+        SELECT {', '.join(ARBITRAGE_COLUMNS)}
+        FROM candidates
+        WHERE profit_percentage BETWEEN {MIN_PROFIT_PERCENTAGE} AND {MAX_PROFIT_PERCENTAGE}
+        ORDER BY ref_ord, date_ord, curr_ord
+    """, con)
+
+    if opportunities.empty:
+        return pd.DataFrame()
+    opportunities['date'] = opportunities['date'].astype('datetime64[ns]')
+    return opportunities
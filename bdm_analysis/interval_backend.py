@@ -0,0 +1,482 @@
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+from bdm_analysis import analyze_data
+from bdm_analysis.arbitrage_analysis import (
+    ARBITRAGE_COLUMNS, MAIN_CURRENCIES, MAX_PRICE_EUR, MAX_PROFIT_PERCENTAGE, MIN_PRICE_EUR, MIN_PROFIT_PERCENTAGE
+)
+
+# Daily columns rebuilt on expansion instead of being stored
+DERIVED_COLUMNS = ['life_span_date', 'price_eur', 'year', 'quarter']
+# Two conversion rates closer than this (relative) are treated as the same rate
+RATE_TOLERANCE = 1e-9
+ONE_DAY = pd.Timedelta(days=1)
+
+@dataclass
+class PriceIntervals:
+    """
+    Run-length compressed daily prices: one row per run of consecutive days
+    over which a (reference_code, currency) series keeps the same price.
+
+    intervals: start_date, end_date, n_days, price, fixed_rate, slot, last_row
+        and the other columns of the daily rows, constant over the run. `slot`
+        tells apart several observations of a series on the same day, in price
+        order, so that each source (e.g. each eurozone country) keeps its slot
+        from day to day; `last_row` is the position of the run's last daily row
+        in the input.
+    rates: EUR rate of each (currency, date). price_eur is price * rate,
+        or price * fixed_rate for runs converted at another rate (fallback rates).
+    columns: column order of the daily rows
+    first_slots: for series with several observations on a day, runs of days
+        (reference_code, currency, start_date, end_date, slot) over which the
+        observation that comes first in the input has the same slot. Kept
+        apart, so that a changing input order does not break the price runs.
+    """
+    intervals: pd.DataFrame
+    rates: pd.DataFrame
+    columns: list
+    first_slots: pd.DataFrame
+    _rate_index: dict = field(default=None, repr=False)
+
+def _changed(values):
+    """
+    True where a value differs from the previous one (missing values compare equal).
+    """
+    previous = values.shift()
+    both_missing = (values.isna() & previous.isna()).to_numpy(dtype=bool)
+    return (values != previous).fillna(True).to_numpy(dtype=bool) & ~both_missing
+
+def compress_prices(df):
+    """
+    Store only the change points of each (reference_code, currency) series.
+    A run ends when the price (or any other stored column) changes, or when a
+    day is missing. expand_intervals gives back the daily rows.
+
+    Returns:
+        PriceIntervals
+    """
+    daily = df.assign(life_span_date=pd.to_datetime(df['life_span_date']), last_row=np.arange(len(df)))
+    # Same-day observations of a series are numbered by price, not by input
+    # order, so a run is not broken when the sources come in another order
+    keys = ['reference_code', 'currency', 'life_span_date']
+    by_price = daily.reset_index(drop=True).sort_values('price', kind='stable')
+    slot = np.empty(len(daily), dtype=np.int64)
+    slot[by_price.index.to_numpy()] = by_price.groupby(keys, sort=False).cumcount().to_numpy()
+    daily['slot'] = slot
+
+    # Converted prices share the rate of their currency and day, except fallback conversions
+    rate = daily['price_eur'] / daily['price']
+    day_rate = rate.groupby([daily['currency'], daily['life_span_date']]).transform('median')
+    standard = ((rate / day_rate - 1).abs() <= RATE_TOLERANCE).to_numpy()
+    daily['fixed_rate'] = rate.where(~standard)
+    rates = (day_rate.groupby([daily['currency'], daily['life_span_date']]).first()
+             .rename_axis(['currency', 'date']).rename('rate').reset_index())
+
+    # Slot of the first observation of each day, for series with several observations on a day
+    several = daily.groupby(['reference_code', 'currency'], sort=False)['slot'].transform('max').to_numpy() > 0
+    firsts = daily[~daily.duplicated(keys).to_numpy() & several]
+    firsts = firsts.sort_values(['reference_code', 'currency', 'life_span_date'], kind='stable')
+    new_first = (firsts['life_span_date'].diff() != ONE_DAY).to_numpy().copy()
+    for column in ['reference_code', 'currency', 'slot']:
+        new_first |= _changed(firsts[column])
+    first_dates = firsts['life_span_date'].groupby(np.cumsum(new_first), sort=False)
+    first_slots = firsts.loc[new_first, ['reference_code', 'currency', 'slot']].reset_index(drop=True)
+    first_slots.insert(2, 'start_date', firsts['life_span_date'].to_numpy()[new_first])
+    first_slots.insert(3, 'end_date', first_dates.last().to_numpy())
+
+    daily = daily.sort_values(['reference_code', 'currency', 'slot', 'life_span_date'], kind='stable')
+    stored = [column for column in daily.columns if column not in DERIVED_COLUMNS + ['fixed_rate', 'last_row']]
+    new_run = (daily['life_span_date'].diff() != ONE_DAY).to_numpy().copy()
+    for column in stored:
+        new_run |= _changed(daily[column])
+    fixed_rate = daily['fixed_rate']
+    previous_rate = fixed_rate.shift()
+    new_run |= (fixed_rate.isna() != previous_rate.isna()).to_numpy()
+    new_run |= ((fixed_rate / previous_rate - 1).abs() > RATE_TOLERANCE).to_numpy()
+
+    run_dates = daily['life_span_date'].groupby(np.cumsum(new_run), sort=False)
+    intervals = daily.loc[new_run, stored + ['fixed_rate']].reset_index(drop=True)
+    intervals.insert(0, 'start_date', daily['life_span_date'].to_numpy()[new_run])
+    intervals.insert(1, 'end_date', run_dates.last().to_numpy())
+    intervals.insert(2, 'n_days', run_dates.size().to_numpy())
+    intervals['last_row'] = daily['last_row'].groupby(np.cumsum(new_run), sort=False).last().to_numpy()
+
+    print(f"Compressed {len(df)} daily rows into {len(intervals)} price intervals "
+          f"({len(df) / max(len(intervals), 1):.1f}x)")
+    return PriceIntervals(intervals, rates, list(df.columns), first_slots)
+
+def expand_intervals(compressed, references=None):
+    """
+    Daily rows of the compressed prices (of `references` only, if given),
+    sorted by reference_code, currency, slot and date.
+    """
+    intervals = compressed.intervals
+    if references is not None:
+        intervals = intervals[intervals['reference_code'].isin(references)]
+    n_days = intervals['n_days'].to_numpy()
+    rows = intervals.iloc[np.repeat(np.arange(len(intervals)), n_days)].reset_index(drop=True)
+    offsets = np.arange(n_days.sum()) - np.repeat(np.cumsum(n_days) - n_days, n_days)
+    dates = rows['start_date'] + pd.to_timedelta(offsets, unit='D')
+
+    day_rates = compressed.rates.set_index(['currency', 'date'])['rate']
+    day_rate = day_rates.reindex(pd.MultiIndex.from_arrays([rows['currency'], dates])).to_numpy()
+    rate = np.where(rows['fixed_rate'].isna(), day_rate, rows['fixed_rate'])
+
+    daily = rows.drop(columns=['start_date', 'end_date', 'n_days', 'slot', 'fixed_rate', 'last_row'])
+    daily['life_span_date'] = dates
+    daily['price_eur'] = rows['price'].to_numpy(dtype=float) * rate
+    if 'year' in compressed.columns:
+        daily['year'] = dates.dt.year
+    if 'quarter' in compressed.columns:
+        daily['quarter'] = dates.dt.quarter
+    return daily[compressed.columns]
+
+def _rate_index(compressed):
+    """
+    Per currency and day: prefix sums of the rate and of its square, and
+    sparse tables of its minimum and maximum, for O(1) range queries.
+    """
+    if compressed._rate_index is None:
+        rates = compressed.rates
+        currencies = pd.Index(sorted(rates['currency'].unique()))
+        first_day = rates['date'].min()
+        n_days = (rates['date'].max() - first_day).days + 1
+        table = np.full((len(currencies), n_days), np.nan)
+        table[currencies.get_indexer(rates['currency']), (rates['date'] - first_day).dt.days] = rates['rate']
+
+        filled = np.nan_to_num(table)
+        sums = np.concatenate([np.zeros((len(currencies), 1)), np.cumsum(filled, axis=1)], axis=1)
+        squares = np.concatenate([np.zeros((len(currencies), 1)), np.cumsum(filled ** 2, axis=1)], axis=1)
+        minima, maxima = [np.where(np.isnan(table), np.inf, table)], [np.where(np.isnan(table), -np.inf, table)]
+        width = 1
+        while 2 * width <= n_days:
+            minima.append(np.minimum(minima[-1][:, :-width], minima[-1][:, width:]))
+            maxima.append(np.maximum(maxima[-1][:, :-width], maxima[-1][:, width:]))
+            width *= 2
+        compressed._rate_index = {
+            'currencies': currencies, 'first_day': first_day,
+            'sums': sums, 'squares': squares, 'minima': minima, 'maxima': maxima
+        }
+    return compressed._rate_index
+
+def _rate_stats(compressed, currency, start_date, end_date, fixed_rate):
+    """
+    Sum, sum of squares, minimum and maximum of the daily rate over each
+    [start_date, end_date] segment (arrays of equal length).
+    """
+    index = _rate_index(compressed)
+    row = index['currencies'].get_indexer(currency)
+    start = (pd.DatetimeIndex(start_date) - index['first_day']).days.to_numpy()
+    end = (pd.DatetimeIndex(end_date) - index['first_day']).days.to_numpy()
+    length = end - start + 1
+
+    sums = index['sums'][row, end + 1] - index['sums'][row, start]
+    squares = index['squares'][row, end + 1] - index['squares'][row, start]
+    minimum = np.empty(len(row))
+    maximum = np.empty(len(row))
+    level = np.floor(np.log2(np.maximum(length, 1))).astype(int)
+    for k in np.unique(level):
+        at = level == k
+        second = end[at] - (1 << k) + 1
+        minimum[at] = np.minimum(index['minima'][k][row[at], start[at]], index['minima'][k][row[at], second])
+        maximum[at] = np.maximum(index['maxima'][k][row[at], start[at]], index['maxima'][k][row[at], second])
+
+    fixed = np.asarray(fixed_rate, dtype=float)
+    has_fixed = ~np.isnan(fixed)
+    sums = np.where(has_fixed, fixed * length, sums)
+    squares = np.where(has_fixed, fixed ** 2 * length, squares)
+    minimum = np.where(has_fixed, fixed, minimum)
+    maximum = np.where(has_fixed, fixed, maximum)
+    return sums, squares, minimum, maximum
+
+def _price_eur_moments(compressed, intervals):
+    """
+    Per interval: number of days, sum, sum of squares, min and max of price_eur.
+    """
+    sums, squares, minimum, maximum = _rate_stats(
+        compressed, intervals['currency'], intervals['start_date'], intervals['end_date'], intervals['fixed_rate']
+    )
+    price = intervals['price'].to_numpy(dtype=float)
+    return pd.DataFrame({
+        'n': intervals['n_days'].to_numpy(),
+        'sum': price * sums,
+        'sum_squares': price ** 2 * squares,
+        'min': price * minimum,
+        'max': price * maximum,
+    }, index=intervals.index)
+
+def _describe(moments):
+    """
+    count, mean, min, max and sample std from grouped interval moments.
+    """
+    n = moments['n']
+    mean = moments['sum'] / n
+    variance = (moments['sum_squares'] - n * mean ** 2) / (n - 1)
+    return pd.DataFrame({
+        'count': n,
+        'mean': mean,
+        'min': moments['min'],
+        'max': moments['max'],
+        'std': np.sqrt(variance.clip(lower=0)).where(n > 1),
+    })
+
+def _aggregate(moments, keys):
+    return moments.groupby(keys).agg({'n': 'sum', 'sum': 'sum', 'sum_squares': 'sum', 'min': 'min', 'max': 'max'})
+
+def verify_dataset_metrics(compressed):
+    """
+    Verify and display key dataset metrics.
+    """
+    intervals = compressed.intervals
+    dates = compressed.rates['date'].drop_duplicates().sort_values()
+
+    print("\nVerifying dataset metrics:")
+    n_refs = intervals['reference_code'].nunique()
+    print(f"\n1. Number of unique references: {n_refs}")
+    print("\nReference examples:")
+    print(intervals['reference_code'].unique()[:5])
+    n_currencies = intervals['currency'].nunique()
+    print(f"\n2. Number of unique currencies: {n_currencies}")
+    print("\nCurrencies present:")
+    print(intervals['currency'].unique())
+    print(f"\n3. Number of unique dates: {len(dates)}")
+    print("\nAvailable dates:")
+    print(list(dates))
+
+    return {
+        'n_references': n_refs,
+        'n_currencies': n_currencies,
+        'n_dates': len(dates)
+    }
+
+def analyze_collections(compressed):
+    """
+    Statistical analysis by collection.
+    """
+    intervals = compressed.intervals
+    stats = _describe(_aggregate(_price_eur_moments(compressed, intervals), intervals['collection'])).round(2)
+    stats.columns = [
+        'model_count',
+        'avg_price_eur',
+        'min_price_eur',
+        'max_price_eur',
+        'price_std_eur'
+    ]
+    return stats.rename_axis('collection').reset_index()
+
+def analyze_time_trends(compressed):
+    """
+    Temporal trend analysis. Intervals spanning several quarters are split at quarter boundaries.
+    """
+    intervals = compressed.intervals
+    first_quarter = pd.PeriodIndex(intervals['start_date'], freq='Q')
+    n_quarters = (pd.PeriodIndex(intervals['end_date'], freq='Q').asi8 - first_quarter.asi8) + 1
+    pieces = intervals.iloc[np.repeat(np.arange(len(intervals)), n_quarters)].reset_index(drop=True)
+    offsets = np.arange(n_quarters.sum()) - np.repeat(np.cumsum(n_quarters) - n_quarters, n_quarters)
+    quarter = first_quarter[np.repeat(np.arange(len(intervals)), n_quarters)] + offsets
+    pieces['start_date'] = np.maximum(pieces['start_date'], quarter.start_time.to_numpy())
+    pieces['end_date'] = np.minimum(pieces['end_date'], quarter.end_time.normalize().to_numpy())
+    pieces['n_days'] = (pieces['end_date'] - pieces['start_date']).dt.days + 1
+    pieces['year_quarter'] = quarter
+
+    stats = _describe(_aggregate(_price_eur_moments(compressed, pieces), pieces['year_quarter']))
+    trends = pd.DataFrame({
+        'avg_price_eur': stats['mean'],
+        'model_count': stats['count'],
+        'unique_references': pieces.groupby('year_quarter')['reference_code'].nunique(),
+        'unique_collections': pieces.groupby('year_quarter')['collection'].nunique(),
+    }).round(2)
+    return trends.rename_axis('year_quarter').reset_index()
+
+def generate_summary_stats(compressed):
+    """
+    Generate global dataset statistics.
+    """
+    intervals = compressed.intervals
+    moments = _price_eur_moments(compressed, intervals)
+    days_per_collection = intervals['n_days'].groupby(intervals['collection']).sum()
+    summary = {
+        'total_models': intervals['reference_code'].nunique(),
+        'total_collections': intervals['collection'].nunique(),
+        'avg_price_eur': np.round(moments['sum'].sum() / moments['n'].sum(), 2),
+        'price_range_eur': f"{moments['min'].min():.2f} - {moments['max'].max():.2f}",
+        # Ties are broken like Series.mode(): smallest value first
+        'most_common_collection': days_per_collection[days_per_collection == days_per_collection.max()].index.min(),
+        'date_range': f"{intervals['start_date'].min()} - {intervals['end_date'].max()}"
+    }
+    return summary
+
+def analyze_price_ranges(compressed):
+    """
+    Price range segmentation, on the daily rows: a converted price can cross a
+    range boundary within an interval.
+    """
+    return analyze_data.analyze_price_ranges(expand_intervals(compressed))
+
+def create_price_reference_matrix(compressed):
+    """
+    Create a price reference matrix by currency (one row per reference and day).
+    """
+    return analyze_data.create_price_reference_matrix(expand_intervals(compressed))
+
+def analyze_currency_variations(compressed):
+    """
+    Analyze price variations between currencies.
+    The latest price of a reference is that of its last row on its last date,
+    in input order (like the DuckDB backend, and pandas with a stable sort).
+    """
+    intervals = compressed.intervals
+    at_last_date = intervals[intervals['end_date'] == intervals.groupby('reference_code')['end_date'].transform('max')]
+    latest = at_last_date.loc[at_last_date.groupby('reference_code')['last_row'].idxmax()]
+    day_rates = compressed.rates.set_index(['currency', 'date'])['rate']
+    day_rate = day_rates.reindex(pd.MultiIndex.from_arrays([latest['currency'], latest['end_date']])).to_numpy()
+    latest_prices = latest['price'].to_numpy(dtype=float) * np.where(latest['fixed_rate'].isna(), day_rate,
+                                                                       latest['fixed_rate'])
+    latest_prices = pd.Series(latest_prices)
+
+    return {
+        'avg_eur_price': latest_prices.mean(),
+        'min_eur_price': latest_prices.min(),
+        'max_eur_price': latest_prices.max(),
+        'price_std_eur': latest_prices.std(),
+        'total_references': len(latest_prices),
+        'currencies_count': intervals['currency'].nunique(),
+        'date_range': f"{intervals['start_date'].min()} - {intervals['end_date'].max()}"
+    }
+
+def _overlapping(left, right, keys):
+    """
+    Interval join: row positions (left, right) of the pairs of intervals with
+    equal `keys` whose [start_date, end_date] overlap. The intervals of
+    `right` with the same keys must not overlap each other, so that sorted by
+    start, their ends increase too.
+    """
+    if left.empty or right.empty:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    codes, _ = pd.factorize(pd.MultiIndex.from_frame(pd.concat([left[keys], right[keys]])))
+    first_day = min(left['start_date'].min(), right['start_date'].min())
+    span = (max(left['end_date'].max(), right['end_date'].max()) - first_day).days + 2
+
+    def day_key(frame, frame_codes, column):
+        return frame_codes.astype(np.int64) * span + (frame[column] - first_day).dt.days.to_numpy()
+
+    left_codes, right_codes = codes[:len(left)], codes[len(left):]
+    order = np.argsort(day_key(right, right_codes, 'start_date'), kind='stable')
+    right_starts = day_key(right, right_codes, 'start_date')[order]
+    right_ends = day_key(right, right_codes, 'end_date')[order]
+    first = np.searchsorted(right_ends, day_key(left, left_codes, 'start_date'), side='left')
+    last = np.searchsorted(right_starts, day_key(left, left_codes, 'end_date'), side='right')
+    n_overlaps = np.clip(last - first, 0, None)
+    left_rows = np.repeat(np.arange(len(left)), n_overlaps)
+    right_rows = order[np.repeat(first, n_overlaps)
+                       + (np.arange(n_overlaps.sum()) - np.repeat(np.cumsum(n_overlaps) - n_overlaps, n_overlaps))]
+    return left_rows, right_rows
+
+def _first_observations(compressed):
+    """
+    Intervals of the observation that comes first in the input on each day of
+    a series (one per series and day), cut to the days where it comes first.
+    """
+    intervals = compressed.intervals
+    first_slots = compressed.first_slots
+    series = ['reference_code', 'currency']
+    several = pd.MultiIndex.from_frame(intervals[series]).isin(pd.MultiIndex.from_frame(first_slots[series]))
+    single = intervals[~several]
+    shared = intervals[several]
+
+    run_rows, interval_rows = _overlapping(first_slots, shared, series + ['slot'])
+    firsts = shared.iloc[interval_rows].copy()
+    firsts['start_date'] = np.maximum(first_slots['start_date'].to_numpy()[run_rows], firsts['start_date'].to_numpy())
+    firsts['end_date'] = np.minimum(first_slots['end_date'].to_numpy()[run_rows], firsts['end_date'].to_numpy())
+    firsts['n_days'] = (firsts['end_date'] - firsts['start_date']).dt.days + 1
+    return pd.concat([single, firsts])
+
+def calculate_arbitrage_opportunities(compressed) -> pd.DataFrame:
+    """
+    Calculate arbitrage opportunities in both directions (EUR -> other currency and other currency -> EUR).
+    Same rules as arbitrage_analysis.calculate_arbitrage_opportunities, rows sorted by reference and date.
+
+    EUR and foreign intervals of each reference are joined on their overlap.
+    Overlaps whose range of converted prices cannot produce an opportunity are
+    dropped before the remaining ones are expanded to days.
+    """
+    # Like the daily version, the first observation of a series on a day is used
+    intervals = _first_observations(compressed)
+    intervals = intervals[intervals['currency'].isin(MAIN_CURRENCIES)]
+    eur = intervals[(intervals['currency'] == 'EUR') & intervals['price'].between(MIN_PRICE_EUR, MAX_PRICE_EUR)]
+    foreign = intervals[intervals['currency'] != 'EUR']
+    if eur.empty or foreign.empty:
+        return pd.DataFrame()
+
+    # EUR intervals of a reference do not overlap: one first observation per day
+    foreign_rows, eur_rows = _overlapping(foreign, eur, ['reference_code'])
+
+    pairs = pd.DataFrame({
+        'reference_code': foreign['reference_code'].to_numpy()[foreign_rows],
+        'currency': foreign['currency'].to_numpy()[foreign_rows],
+        'curr_price': foreign['price'].to_numpy(dtype=float)[foreign_rows],
+        'fixed_rate': foreign['fixed_rate'].to_numpy(dtype=float)[foreign_rows],
+        'eur_price': eur['price'].to_numpy(dtype=float)[eur_rows],
+        'start_date': np.maximum(foreign['start_date'].to_numpy()[foreign_rows], eur['start_date'].to_numpy()[eur_rows]),
+        'end_date': np.minimum(foreign['end_date'].to_numpy()[foreign_rows], eur['end_date'].to_numpy()[eur_rows]),
+    })
+
+    # Keep overlaps whose converted price range meets a profitable band (with a small safety margin)
+    _, _, min_rate, max_rate = _rate_stats(compressed, pairs['currency'], pairs['start_date'],
+                                           pairs['end_date'], pairs['fixed_rate'])
+    low = pairs['curr_price'].to_numpy() * min_rate * (1 - 1e-6)
+    high = pairs['curr_price'].to_numpy() * max_rate * (1 + 1e-6)
+    eur_price = pairs['eur_price'].to_numpy()
+    in_bounds = (high >= MIN_PRICE_EUR) & (low <= MAX_PRICE_EUR)
+    min_ratio, max_ratio = 1 + MIN_PROFIT_PERCENTAGE / 100, 1 + MAX_PROFIT_PERCENTAGE / 100
+    foreign_dearer = (high >= eur_price * min_ratio) & (low <= eur_price * max_ratio)
+    foreign_cheaper = (high >= eur_price / max_ratio) & (low <= eur_price / min_ratio)
+    pairs = pairs[in_bounds & (foreign_dearer | foreign_cheaper)]
+
+    # Daily check of the candidate overlaps
+    n_days = ((pairs['end_date'] - pairs['start_date']).dt.days + 1).to_numpy()
+    days = pairs.iloc[np.repeat(np.arange(len(pairs)), n_days)].reset_index(drop=True)
+    offsets = np.arange(n_days.sum()) - np.repeat(np.cumsum(n_days) - n_days, n_days)
+    days['date'] = days['start_date'] + pd.to_timedelta(offsets, unit='D')
+    day_rates = compressed.rates.set_index(['currency', 'date'])['rate']
+    day_rate = day_rates.reindex(pd.MultiIndex.from_arrays([days['currency'], days['date']])).to_numpy()
+    days['curr_price_eur'] = days['curr_price'] * np.where(days['fixed_rate'].isna(), day_rate, days['fixed_rate'])
+    days = days[days['curr_price_eur'].between(MIN_PRICE_EUR, MAX_PRICE_EUR)]
+    days['exchange_rate'] = days['curr_price_eur'] / days['curr_price']
+
+    dearer = days[days['curr_price_eur'] > days['eur_price']]
+    eur_to_foreign = pd.DataFrame({
+        'reference_code': dearer['reference_code'],
+        'buy_currency': 'EUR',
+        'buy_price': dearer['eur_price'],
+        'sell_currency': dearer['currency'],
+        'sell_price_local': dearer['curr_price'],
+        'sell_price_eur': dearer['curr_price_eur'],
+        'exchange_rate': dearer['exchange_rate'],
+        'potential_profit_eur': dearer['curr_price_eur'] - dearer['eur_price'],
+        'profit_percentage': (dearer['curr_price_eur'] - dearer['eur_price']) / dearer['eur_price'] * 100,
+        'date': dearer['date'],
+        'arbitrage_direction': 'EUR->Foreign'
+    })
+    cheaper = days[days['eur_price'] > days['curr_price_eur']]
+    foreign_to_eur = pd.DataFrame({
+        'reference_code': cheaper['reference_code'],
+        'buy_currency': cheaper['currency'],
+        'buy_price': cheaper['curr_price'],
+        'sell_currency': 'EUR',
+        'sell_price_local': cheaper['eur_price'],
+        'sell_price_eur': cheaper['eur_price'],
+        'exchange_rate': cheaper['exchange_rate'],
+        'potential_profit_eur': cheaper['eur_price'] - cheaper['curr_price_eur'],
+        'profit_percentage': (cheaper['eur_price'] - cheaper['curr_price_eur']) / cheaper['curr_price_eur'] * 100,
+        'date': cheaper['date'],
+        'arbitrage_direction': 'Foreign->EUR'
+    })
+
+    opportunities = pd.concat([eur_to_foreign, foreign_to_eur])
+    opportunities = opportunities[opportunities['profit_percentage'].between(MIN_PROFIT_PERCENTAGE, MAX_PROFIT_PERCENTAGE)]
+    currency_order = opportunities['buy_currency'].where(opportunities['buy_currency'] != 'EUR',
+                                                         opportunities['sell_currency'])
+    opportunities = opportunities.assign(_currency=currency_order.map(MAIN_CURRENCIES.index))
+    opportunities = opportunities.sort_values(['reference_code', 'date', '_currency'], kind='stable')
+    return opportunities[ARBITRAGE_COLUMNS].reset_index(drop=True)
@@ -1,24 +1,63 @@
-from google.oauth2 import service_account
-from google.cloud import bigquery
 import os
+import pandas as pd
 
-def load_data_from_bigquery():
+TABLE = "edhec-business-manageme.luxurydata2502.price-monitoring-2022"
+
+def get_bigquery_client():
+    """
+    Create a BigQuery client from the GCP credentials file.
+    """
+    from google.oauth2 import service_account
+    from google.cloud import bigquery
+
+    key_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
+    credentials = service_account.Credentials.from_service_account_file(key_path)
+    return bigquery.Client(credentials=credentials, project=credentials.project_id)
+
+def list_brands():
+    """
+    List every brand present in the price monitoring table.
+
+    Returns:
+        list: Brand names, sorted
+    """
+    try:
+        client = get_bigquery_client()
+        query = f"SELECT DISTINCT brand FROM `{TABLE}` WHERE brand IS NOT NULL ORDER BY brand"
+        return client.query(query).to_dataframe()['brand'].tolist()
+    except Exception as e:
+        print(f"Error listing brands: {e}")
+        return []
+
+def load_data_from_bigquery(brands='Panerai'):
     """
     Loads raw data from BigQuery using GCP credentials.
+
+    Args:
+        brands (str or list): A brand, a list of brands, or 'all'
     
     Returns:
         pd.DataFrame: Raw dataset
     """
+    from google.cloud import bigquery
+
     try:
-        key_path = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
-        credentials = service_account.Credentials.from_service_account_file(key_path)
-        client = bigquery.Client(credentials=credentials, project=credentials.project_id)
+        client = get_bigquery_client()
         
-        query = """
-        SELECT * FROM `edhec-business-manageme.luxurydata2502.price-monitoring-2022`
-        WHERE brand = 'Panerai'
-        """
-        df = client.query(query).to_dataframe()
+        if brands == 'all':
+            query = f"SELECT * FROM `{TABLE}`"
+            job_config = None
+        else:
+            if isinstance(brands, str):
+                brands = [brands]
+            query = f"""
+            SELECT * FROM `{TABLE}`
+            WHERE brand IN UNNEST(@brands)
+            """
+            job_config = bigquery.QueryJobConfig(
+                query_parameters=[bigquery.ArrayQueryParameter('brands', 'STRING', list(brands))]
+            )
+        df = client.query(query, job_config=job_config).to_dataframe()
         
         if df.empty:
             print("No data found for this query.")
@@ -29,4 +68,64 @@ def load_data_from_bigquery():
         return df
     except Exception as e:
         print(f"Error loading data: {e}")
-        return None
\ No newline at end of file
+        return None
+
+def load_snapshot(path):
+    """
+    Load a cached dataset snapshot (.parquet, .csv or .pkl) instead of querying BigQuery.
+    Published .arrow datasets are memory-mapped rather than read.
+
+    Returns:
+        pd.DataFrame: Snapshot contents
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        df = pd.read_parquet(path)
+    elif extension == '.csv':
+        df = pd.read_csv(path, parse_dates=['life_span_date'])
+    elif extension in ('.pkl', '.pickle'):
+        df = pd.read_pickle(path)
+    elif extension == '.arrow':
+        from bdm_analysis.shared_dataset import attach_dataset
+        df = attach_dataset(path)
+    else:
+        raise ValueError(f"Unsupported snapshot format: {path}")
+    print(f"Loaded {len(df)} rows from {path}")
+    return df
+
+def list_snapshot_brands(path):
+    """
+    List the brands of a cached snapshot, reading only its brand column
+    (a .pkl snapshot has to be loaded whole).
+
+    Returns:
+        list: Brand names, sorted, or None if the snapshot has no brand column
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.parquet':
+        import pyarrow.parquet as pq
+        if 'brand' not in pq.read_schema(path).names:
+            return None
+        brands = pq.read_table(path, columns=['brand']).column('brand').to_pandas()
+    elif extension == '.csv':
+        if 'brand' not in pd.read_csv(path, nrows=0).columns:
+            return None
+        brands = pd.read_csv(path, usecols=['brand'])['brand']
+    else:
+        df = load_snapshot(path)
+        if 'brand' not in df.columns:
+            return None
+        brands = df['brand']
+    return sorted(brands.dropna().unique())
+
+def save_snapshot(df, path):
+    """
+    Save a dataset snapshot as Parquet.
+
+    Returns:
+        str: Path of the written file
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Small row groups keep min/max statistics selective for filter pushdown
+    df.to_parquet(path, index=False, row_group_size=100_000)
+    return path
@@ -1,119 +1,527 @@
-from bdm_analysis.load_data import load_data_from_bigquery
-from bdm_analysis.clean_data import clean_data
-from bdm_analysis.analyze_data import (
-    verify_dataset_metrics,
-    analyze_collections,
-    analyze_price_ranges,
-    analyze_time_trends,
-    create_price_reference_matrix,
-    analyze_currency_variations,
-    generate_summary_stats
-)
-from bdm_analysis.aggregate_to_csv import aggregate_to_csv
-from bdm_analysis.predicting_algo import currency_forecast_benefit
-from bdm_analysis.arbitrage_analysis import (
-    calculate_arbitrage_opportunities,
-    analyze_historical_arbitrage,
-    find_stable_arbitrage_pairs,
-    generate_arbitrage_report
-)
-
-def main():
-    """
-    Executes the complete analysis pipeline:
+import argparse
+import datetime
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from types import SimpleNamespace
+import pandas as pd
+from bdm_analysis.checkpoint import checkpointed, checkpoint_key, code_version, fingerprint_file, fingerprint_frame
+
+# Stages run in this order. Modules needed by a stage are imported inside it,
+# so unrequested stages never load their dependencies (BigQuery, sklearn, ...).
+STAGES = ['load', 'clean', 'publish', 'analyze', 'export', 'arbitrage', 'predict', 'snapshot']
+DEFAULT_STAGES = ['load', 'clean', 'analyze', 'export', 'arbitrage']
+
+def resolve_backend(backend=None):
+    """
+    Name of the analysis backend, from the argument or the BDM_BACKEND environment variable.
+    """
+    return (backend or os.getenv('BDM_BACKEND', 'pandas')).lower()
+
+# Functions every analysis backend provides
+ANALYSIS_FUNCTIONS = [
+    'verify_dataset_metrics', 'analyze_collections', 'analyze_price_ranges', 'analyze_time_trends',
+    'create_price_reference_matrix', 'analyze_currency_variations', 'generate_summary_stats',
+    'calculate_arbitrage_opportunities'
+]
+
+def on_columns_copy(function, columns):
+    """
+    `function` applied to a copy of `columns` of its argument, for analyses that modify their input.
+    """
+    return lambda df: function(df[columns].copy())
+
+def select_backend(clean_df, backend=None, brand=None, snapshot_path=None, source=None):
+    """
+    Pick the engine used for summaries and arbitrage detection.
+    'pandas' (default) runs in memory; 'duckdb' queries a Parquet snapshot
+    of the cleaned data with the embedded SQL engine; 'intervals' works on
+    run-length compressed price intervals.
+    The choice can also be made through the BDM_BACKEND environment variable.
+    For DuckDB, `source` (a ParquetSource) is queried in place; otherwise
+    `clean_df` is first written to a snapshot.
+
+    Returns:
+        tuple: (analysis functions, data argument to pass them)
+    """
+    backend = resolve_backend(backend)
+    if backend == 'duckdb':
+        from bdm_analysis import duckdb_backend
+        if source is None:
+            print("Using DuckDB backend over a Parquet snapshot")
+            source = duckdb_backend.write_parquet_snapshot(clean_df, snapshot_path, brand)
+        else:
+            print(f"Using DuckDB backend over {source.path}")
+        # One connection for every query of the run
+        con = duckdb_backend.connect()
+        engine = SimpleNamespace(**{
+            name: functools.partial(getattr(duckdb_backend, name), con=con)
+            for name in ANALYSIS_FUNCTIONS + ['count_rows']
+        })
+        return engine, source
+    if backend == 'intervals':
+        from bdm_analysis import interval_backend
+        print("Using run-length compressed price intervals")
+        return interval_backend, interval_backend.compress_prices(clean_df)
+    if backend != 'pandas':
+        raise ValueError(f"Unknown backend: {backend}")
+
+    from bdm_analysis import analyze_data
+    from bdm_analysis.arbitrage_analysis import calculate_arbitrage_opportunities
+    engine = SimpleNamespace(
+        verify_dataset_metrics=analyze_data.verify_dataset_metrics,
+        analyze_collections=analyze_data.analyze_collections,
+        # Both add a helper column to their input: they get a copy of the columns they read,
+        # so the cleaned frame (and the snapshot written from it) keeps its schema
+        analyze_price_ranges=on_columns_copy(
+            analyze_data.analyze_price_ranges, ['reference_code', 'collection', 'price_eur']
+        ),
+        analyze_time_trends=on_columns_copy(
+            analyze_data.analyze_time_trends, ['reference_code', 'collection', 'price_eur', 'life_span_date']
+        ),
+        create_price_reference_matrix=analyze_data.create_price_reference_matrix,
+        analyze_currency_variations=analyze_data.analyze_currency_variations,
+        generate_summary_stats=analyze_data.generate_summary_stats,
+        calculate_arbitrage_opportunities=calculate_arbitrage_opportunities
+    )
+    return engine, clean_df
+
+def cleaned_parquet_columns(path):
+    """
+    Columns of `path` if it is a Parquet snapshot of cleaned data (it has
+    price_eur), read from the file schema only; None otherwise.
+    """
+    if path is None or os.path.splitext(path)[1].lower() != '.parquet':
+        return None
+    import pyarrow.parquet as pq
+    columns = pq.read_schema(path).names
+    return columns if 'price_eur' in columns else None
+
+def input_source(brand, options):
+    """
+    ParquetSource over --input, with the brand, date and reference filters
+    pushed into SQL, when the DuckDB backend can query the input in place.
+
+    Returns:
+        ParquetSource or None
+    """
+    if resolve_backend(options.backend) != 'duckdb':
+        return None
+    columns = cleaned_parquet_columns(options.input_path)
+    if columns is None:
+        return None
+    from bdm_analysis.duckdb_backend import ParquetSource
+    return ParquetSource(
+        options.input_path, options.start_date, options.end_date,
+        tuple(options.references) if options.references else None,
+        brand if 'brand' in columns else None
+    )
+
+def parse_args(argv=None):
+    """
+    Parse the command-line options of the pipeline.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m bdm_analysis.main',
+        description="Watch price analysis pipeline. Only the requested stages are run."
+    )
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=DEFAULT_STAGES,
+                        help=f"Stages to run (default: {' '.join(DEFAULT_STAGES)})")
+    parser.add_argument('--input', dest='input_path',
+                        help="Cached snapshot (.parquet, .csv, .pkl, or a published .arrow dataset) used instead of BigQuery; "
+                             "a snapshot that already has price_eur is treated as cleaned")
+    parser.add_argument('--brands', nargs='+', default=['Panerai'],
+                        help="Brands to process, or 'all' (default: Panerai)")
+    parser.add_argument('--start-date', help="Keep observations from this date (YYYY-MM-DD)")
+    parser.add_argument('--end-date', help="Keep observations up to this date (YYYY-MM-DD)")
+    parser.add_argument('--references', nargs='+',
+                        help="Restrict the analysis (and the predict stage) to these reference codes")
+    parser.add_argument('--currency', default='EUR', help="Currency used by the predict stage (default: EUR)")
+    parser.add_argument('--output-dir',
+                        help="Directory for exports and snapshots (default: bdm_analysis/csv and bdm_analysis/parquet)")
+    parser.add_argument('--export-format', choices=['csv', 'star', 'both'], default='csv',
+                        help="csv: flat summary.csv; star: Parquet fact/dimension tables for Power BI (default: csv)")
+    parser.add_argument('--backend', choices=['pandas', 'duckdb', 'intervals'],
+                        help="Analysis engine (default: BDM_BACKEND or pandas)")
+    parser.add_argument('--approx-summaries', action='store_true',
+                        help="Compute dataset metrics, summary and collection statistics in one streaming pass with mergeable sketches "
+                             "(a cleaned Parquet --input is streamed from disk); the exact analyses are skipped")
+    parser.add_argument('--summary-workers', type=int, default=1,
+                        help="Processes streaming a Parquet --input for --approx-summaries, 0 for all cores (default: 1)")
+    parser.add_argument('--workers', type=int, help="Processes used when several brands are given")
+    parser.add_argument('--outlier-threshold', type=float, default=3.5,
+                        help="Robust z-score above which a price is dropped as an outlier of its series, 0 to keep all prices (default: 3.5)")
+    parser.add_argument('--clean-workers', type=int, default=1,
+                        help="Processes used to clean each brand, 0 for all cores (default: 1)")
+    parser.add_argument('--show-plots', action='store_true', help="Display prediction plots (blocks until closed)")
+    parser.add_argument('--charts', action='store_true',
+                        help="Write a chart file per forecast into the brand's charts/ folder")
+    parser.add_argument('--chart-workers', type=int, default=0,
+                        help="Processes used to render the charts, 0 for all cores (default: 0)")
+    parser.add_argument('--checkpoint-dir', help="Where stage checkpoints are kept (default: bdm_analysis/.checkpoints)")
+    parser.add_argument('--no-checkpoints', action='store_true', help="Neither read nor write stage checkpoints")
+    parser.add_argument('--refresh', action='store_true', help="Recompute every stage and overwrite its checkpoint")
+
+    options = parser.parse_args(argv)
+    options.stages = [stage for stage in STAGES if stage in options.stages]
+    if options.input_path is None and 'load' not in options.stages:
+        parser.error("no data source: add the 'load' stage or pass --input")
+    if options.input_path and not os.path.exists(options.input_path):
+        parser.error(f"--input not found: {options.input_path}")
+    if options.input_path and (options.brands == ['all'] or len(options.brands) > 1):
+        from bdm_analysis.load_data import list_snapshot_brands
+        brands = list_snapshot_brands(options.input_path)
+        if brands is None:
+            parser.error(f"{options.input_path} has no brand column: pass a single brand to --brands")
+        if options.brands == ['all']:
+            options.brands = brands
+    elif options.brands == ['all']:
+        options.brands = 'all'
+    return options
+
+def filter_data(df, start_date=None, end_date=None, references=None):
+    """
+    Keep the requested date range and reference set.
+    """
+    if start_date or end_date:
+        dates = pd.to_datetime(df['life_span_date'], errors='coerce')
+        mask = dates.notna()
+        if start_date:
+            mask &= dates >= pd.Timestamp(start_date)
+        if end_date:
+            mask &= dates <= pd.Timestamp(end_date)
+        df = df[mask]
+    if references:
+        df = df[df['reference_code'].str.strip().isin(references)]
+    return df
+
+def overwrites_input(path, options):
+    """
+    True (with a warning) if `path` is the --input file: a run never writes over its own input.
+    """
+    if options.input_path and os.path.realpath(path) == os.path.realpath(options.input_path):
+        print(f" Warning: not writing {path}, it is the --input file")
+        return True
+    return False
+
+def select_rows(df, brand=None, start_date=None, end_date=None, references=None):
+    """
+    Rows of `brand` (when the data has a brand column) in the requested date range and reference set.
+    """
+    if brand is not None and 'brand' in df.columns:
+        df = df[df['brand'] == brand]
+    return filter_data(df, start_date, end_date, references)
+
+def load_stage(brand, options):
+    """
+    Load the raw data of a brand, from the cached snapshot or BigQuery.
+    """
+    if options.input_path:
+        from bdm_analysis.load_data import load_snapshot
+        df = load_snapshot(options.input_path)
+        if 'brand' in df.columns:
+            df = df[df['brand'] == brand]
+        return df
+
+    from bdm_analysis.load_data import load_data_from_bigquery
+    print("\nLoading data from BigQuery...")
+    return load_data_from_bigquery(brand)
+
+def run_pipeline(brand='Panerai', options=None):
+    """
+    Executes the requested stages of the analysis pipeline for one brand:
     1. Data loading
     2. Data cleaning
-    3. Analyses and predictions
+    3. Analyses, exports, arbitrage and predictions
+
+    Returns:
+        dict: Brand summary for the cross-brand table, or None on failure
     """
-    print("Starting the analysis pipeline...")
+    if options is None:
+        options = parse_args([])
+    stages = options.stages
+    print(f"Starting the analysis pipeline for {brand} (stages: {', '.join(stages)})...")
 
-    #Data loading
-    print("\nLoading data from BigQuery...")
-    raw_df = load_data_from_bigquery()
-    if raw_df is None or raw_df.empty:
-        print("No data retrieved, exiting.")
-        return
+    from bdm_analysis.aggregate_to_csv import get_output_dir
+    brand_dir = get_output_dir(brand, options.output_dir)
+    # Working copy queried by DuckDB, kept apart from the snapshot stage output
+    duckdb_path = os.path.join(brand_dir, 'duckdb_snapshot.parquet') if options.output_dir else None
+
+    def checkpointed_stage(stage, key, compute):
+        return checkpointed(stage, key, compute, options.checkpoint_dir,
+                            enabled=not options.no_checkpoints, refresh=options.refresh)
+
+    # A cleaned Parquet input is queried in place by DuckDB, and streamed from
+    # disk by --approx-summaries: the frame is only loaded when another stage needs it
+    source = input_source(brand, options)
+    stream_summaries = options.approx_summaries and cleaned_parquet_columns(options.input_path) is not None
+    frame_stages = set(stages) - {'load', 'clean'}
+    if source is not None:
+        frame_stages -= {'analyze', 'arbitrage'}
+    if stream_summaries:
+        frame_stages -= {'analyze'}
 
-    #Data cleaning
-    print("\nCleaning data...")
-    clean_df = clean_data(raw_df)
+    clean_df = engine = data = n_rows = None
+    if (source is not None or stream_summaries) and not frame_stages:
+        print(f"\nReading {options.input_path} in place, without loading it.")
+        if source is not None:
+            engine, data = select_backend(None, options.backend, brand, source=source)
+            n_rows = engine.count_rows(data)
+            if n_rows == 0:
+                print("No data left after filtering, exiting.")
+                return None
+        clean_key = checkpoint_key('clean', fingerprint_file(options.input_path), brand,
+                                   options.start_date, options.end_date, options.references)
+    else:
+        #Data loading
+        if options.input_path:
+            df = load_stage(brand, options)
+        else:
+            # BigQuery extracts are checkpointed for the day
+            df = checkpointed_stage('raw', checkpoint_key('raw', brand, datetime.date.today().isoformat()),
+                                    lambda: load_stage(brand, options))
+        if df is None or df.empty:
+            print("No data retrieved, exiting.")
+            return None
+        df = filter_data(df, options.start_date, options.end_date, options.references)
+        if df.empty:
+            print("No data left after filtering, exiting.")
+            return None
+
+        #Data cleaning
+        if 'price_eur' in df.columns:
+            print("\nInput is already cleaned, skipping cleaning.")
+            clean_key = fingerprint_frame(df)
+        elif 'clean' in stages:
+            from bdm_analysis import clean_data
+            print("\nCleaning data...")
+            clean_key = checkpoint_key('clean', fingerprint_frame(df), options.outlier_threshold, code_version(clean_data))
+            df = checkpointed_stage('clean', clean_key, lambda: clean_data.clean_data(
+                df, outlier_threshold=options.outlier_threshold or None, n_jobs=options.clean_workers or None
+            ))
+        elif set(stages) - {'load'}:
+            print("Input is not cleaned: add the 'clean' stage, exiting.")
+            return None
+        clean_df = df
+        n_rows = len(clean_df)
+
+    # Shared memory-mapped copy for the dashboard and other workers
+    if 'publish' in stages:
+        from bdm_analysis.shared_dataset import get_shared_path, publish_dataset
+        shared_path = os.path.join(brand_dir, 'clean_data.arrow') if options.output_dir else get_shared_path(brand)
+        if not overwrites_input(shared_path, options):
+            publish_dataset(clean_df, shared_path)
 
-    # Analyses
-    print("\nRunning analyses...")
+    result = {'brand': brand, 'rows': n_rows}
     try:
-        # Basic metrics verification
-        metrics = verify_dataset_metrics(clean_df)
-
-        # Overall statistics
-        summary = generate_summary_stats(clean_df)
-        print("\nOverall Summary:")
-        for key, value in summary.items():
-            print(f"{key}: {value}")
-
-        # Collection analysis
-        collection_stats = analyze_collections(clean_df)
-        print("\nCollection Statistics:")
-        print(collection_stats)
-
-        # Price range analysis
-        price_ranges = analyze_price_ranges(clean_df)
-        print("\n Price Range Analysis:")
-        print(price_ranges)
-
-        # Time trends
-        time_trends = analyze_time_trends(clean_df)
-        print("\nTime Trends:")
-        print(time_trends.head())
-
-        # Currency analysis
-        currency_stats = analyze_currency_variations(clean_df)
-        print("\n Currency Analysis:")
-        for key, value in currency_stats.items():
-            print(f"{key}: {value}")
-
-        # Price reference matrix
-        price_matrix = create_price_reference_matrix(clean_df)
-        print("\n Price Reference Matrix (sample):")
-        print(price_matrix.head())
+        if 'analyze' in stages and engine is None and not options.approx_summaries:
+            engine, data = select_backend(clean_df, options.backend, brand, duckdb_path, source)
+
+        # Analyses
+        if 'analyze' in stages:
+            print("\nRunning analyses...")
+
+            if options.approx_summaries:
+                # Constant-memory sketches, with error bounds instead of exact counts
+                from bdm_analysis.sketches import summarize_frame, summarize_parquet
+                if stream_summaries:
+                    n_jobs = options.summary_workers or os.cpu_count() or 1
+                    print(f"Streaming {options.input_path} on {n_jobs} processes")
+                    sketch = summarize_parquet(
+                        options.input_path, n_jobs=n_jobs,
+                        transform=functools.partial(select_rows, brand=brand, start_date=options.start_date,
+                                                    end_date=options.end_date, references=options.references),
+                        extra_columns=[c for c in ['brand'] if c in cleaned_parquet_columns(options.input_path)]
+                    )
+                else:
+                    sketch = summarize_frame(clean_df)
+                if sketch.rows == 0:
+                    print("No data left after filtering, exiting.")
+                    return None
+                if result['rows'] is None:
+                    result['rows'] = sketch.rows
+                metrics = sketch.dataset_metrics()
+                print("\nApproximate dataset metrics:")
+                for key, value in metrics.items():
+                    print(f"{key}: ~{value}")
+                summary = sketch.summary_stats()
+                error_bounds = summary.pop('error_bounds')
+                collection_stats = sketch.collection_stats()
+            else:
+                # Basic metrics verification
+                metrics = engine.verify_dataset_metrics(data)
+                summary = engine.generate_summary_stats(data)
+                error_bounds = None
+                collection_stats = engine.analyze_collections(data)
+
+            # Overall statistics
+            print("\nOverall Summary:")
+            for key, value in summary.items():
+                print(f"{key}: {value}")
+            if error_bounds:
+                print(f"error bounds: {error_bounds}")
+            result.update(summary)
+
+            # Collection analysis
+            print("\nCollection Statistics:")
+            print(collection_stats)
+
+            if options.approx_summaries:
+                # One streaming pass only: no exact pass over all rows
+                print("\nPrice ranges, time trends, currency analysis and price matrix: "
+                      "skipped with --approx-summaries (exact analyses)")
+            else:
+                # Price range analysis
+                price_ranges = engine.analyze_price_ranges(data)
+                print("\n Price Range Analysis:")
+                print(price_ranges)
+
+                # Time trends
+                time_trends = engine.analyze_time_trends(data)
+                print("\nTime Trends:")
+                print(time_trends.head())
+
+                # Currency analysis
+                currency_stats = engine.analyze_currency_variations(data)
+                print("\n Currency Analysis:")
+                for key, value in currency_stats.items():
+                    print(f"{key}: {value}")
+
+                # Price reference matrix
+                price_matrix = engine.create_price_reference_matrix(data)
+                print("\n Price Reference Matrix (sample):")
+                print(price_matrix.head())
 
         # Saving data
-        print("\n Saving aggregated data...")
-        if aggregate_to_csv(clean_df):
-            print("Data saved successfully!")
-        else:
-            print(" Warning: Data may not have been saved properly")
+        if 'export' in stages:
+            from bdm_analysis.aggregate_to_csv import aggregate_to_csv, export_star_schema
+            print("\n Saving aggregated data...")
+            if options.export_format in ('csv', 'both') and \
+                    not overwrites_input(os.path.join(brand_dir, 'summary.csv'), options):
+                if aggregate_to_csv(clean_df, brand, options.output_dir):
+                    print("Data saved successfully!")
+                else:
+                    print(" Warning: Data may not have been saved properly")
+            if options.export_format in ('star', 'both'):
+                star_dir = export_star_schema(clean_df, brand, options.output_dir)
+                print(f"Star schema saved to {star_dir}")
 
         # Arbitrage analysis
-        print("\n Running arbitrage analysis...")
-        try:
-            # Generate and display arbitrage report
-            arbitrage_report = generate_arbitrage_report(clean_df)
-            print("\nArbitrage Report:")
-            print(arbitrage_report)
-            
-            # Find current opportunities
-            current_opportunities = calculate_arbitrage_opportunities(clean_df)
-            if not current_opportunities.empty:
-                print("\nCurrent arbitrage opportunities:")
-                print(current_opportunities.sort_values('profit_percentage', ascending=False).head())
-        except Exception as e:
-            print(f" Warning: Arbitrage analysis failed: {e}")
+        if 'arbitrage' in stages:
+            from bdm_analysis import arbitrage_analysis
+            from bdm_analysis.arbitrage_analysis import generate_arbitrage_report
+            print("\n Running arbitrage analysis...")
+            try:
+                def compute_opportunities():
+                    arbitrage_engine, arbitrage_data = (engine, data) if engine else \
+                        select_backend(clean_df, options.backend, brand, duckdb_path, source)
+                    return arbitrage_engine.calculate_arbitrage_opportunities(arbitrage_data)
+
+                # Find current opportunities
+                backend = resolve_backend(options.backend)
+                arbitrage_modules = [arbitrage_analysis]
+                if backend == 'duckdb':
+                    from bdm_analysis import duckdb_backend
+                    arbitrage_modules.append(duckdb_backend)
+                elif backend == 'intervals':
+                    from bdm_analysis import interval_backend
+                    arbitrage_modules.append(interval_backend)
+                arbitrage_key = checkpoint_key('arbitrage', clean_key, backend, code_version(*arbitrage_modules))
+                current_opportunities = checkpointed_stage('arbitrage', arbitrage_key, compute_opportunities)
+
+                # Generate and display arbitrage report
+                arbitrage_report = generate_arbitrage_report(clean_df, current_opportunities, brand)
+                print("\nArbitrage Report:")
+                print(arbitrage_report)
+
+                result['arbitrage_opportunities'] = len(current_opportunities)
+                if not current_opportunities.empty:
+                    print("\nCurrent arbitrage opportunities:")
+                    print(current_opportunities.sort_values('profit_percentage', ascending=False).head())
+                    current_opportunities.to_csv(os.path.join(brand_dir, 'arbitrage_opportunities.csv'), index=False)
+                    result['avg_profit_percentage'] = current_opportunities['profit_percentage'].mean()
+            except Exception as e:
+                print(f" Warning: Arbitrage analysis failed: {e}")
 
         # 🔮 Currency predictions
-        print("\nRunning currency predictions...")
-        try:
-            # Example with a specific reference
-            reference_to_predict = 'PNPAM00715'  # You can change this reference
-            print(f"\nPredicting best currencies for reference: {reference_to_predict}")
-            currency_forecast_benefit(clean_df, reference_to_predict,currency='EUR')
-        except Exception as e:
-            print(f" Warning: Prediction failed: {e}")
+        if 'predict' in stages:
+            from bdm_analysis import predicting_algo
+            print("\nRunning currency predictions...")
+
+            # Forecasts are pure results; charts are rendered from them afterwards
+            forecast_key = checkpoint_key('forecast', clean_key, options.references, options.currency,
+                                          code_version(predicting_algo))
+            forecast_results = checkpointed_stage('forecast', forecast_key, lambda: predicting_algo.forecast_catalogue(
+                clean_df, options.currency, options.references
+            ))
+            forecasts = predicting_algo.forecasts_frame(forecast_results)
+            if not forecasts.empty:
+                print(forecasts.head())
+                forecasts.to_csv(os.path.join(brand_dir, 'forecasts.csv'), index=False)
+            if options.charts:
+                chart_paths = predicting_algo.save_forecast_charts(
+                    forecast_results, os.path.join(brand_dir, 'charts'), n_jobs=options.chart_workers or None
+                )
+                print(f"{len(chart_paths)} charts saved to {os.path.join(brand_dir, 'charts')}")
+            if options.show_plots:
+                for forecast_result in forecast_results:
+                    predicting_algo.show_forecast(forecast_result)
+
+        # Cleaned snapshot for later --input runs
+        if 'snapshot' in stages:
+            from bdm_analysis.load_data import save_snapshot
+            if options.output_dir:
+                snapshot_path = os.path.join(brand_dir, 'clean_data.parquet')
+            else:
+                script_dir = os.path.dirname(os.path.abspath(__file__))
+                snapshot_path = os.path.join(script_dir, 'parquet', f'brand={brand}', 'clean_data.parquet')
+            if not overwrites_input(snapshot_path, options):
+                print(f"\n Snapshot written to {save_snapshot(clean_df, snapshot_path)}")
 
         print("\nAnalysis pipeline completed successfully!")
 
     except Exception as e:
         print(f" Error during analysis: {e}")
-        return
+        return None
+
+    return result
+
+def main(argv=None):
+    """
+    Runs the requested stages for one brand, a list of brands, or 'all'.
+    Several brands are processed in parallel on a process pool, and their
+    summaries are merged into cross_brand_summary.csv.
+
+    Returns:
+        pd.DataFrame: One summary row per successfully processed brand
+    """
+    options = parse_args(argv)
+
+    brands = options.brands
+    if brands == 'all':
+        from bdm_analysis.load_data import list_brands
+        brands = list_brands()
+    if not brands:
+        print("No brands to process, exiting.")
+        return None
+
+    if len(brands) == 1:
+        brand_summaries = [run_pipeline(brands[0], options)]
+    else:
+        max_workers = min(options.workers or os.cpu_count() or 1, len(brands))
+        print(f"Processing {len(brands)} brands on {max_workers} workers...")
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            brand_summaries = list(executor.map(run_pipeline, brands, [options] * len(brands)))
+
+    if len(brands) == 1:
+        # Nothing to merge: no cross-brand file for a single brand
+        return pd.DataFrame([s for s in brand_summaries if s is not None])
+
+    from bdm_analysis.aggregate_to_csv import save_cross_brand_summary
+    cross_brand = save_cross_brand_summary(brand_summaries, options.output_dir)
+    print("\nCross-brand summary:")
+    print(cross_brand)
+    return cross_brand
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,106 +1,253 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
+from dataclasses import dataclass
 from sklearn.linear_model import LinearRegression
 import os
-import matplotlib.pyplot as plt
+import re
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from bdm_analysis.downsampling import downsample_frame
 
-def currency_forecast_benefit(df, reference_code, currency):
-    """
-    For a given reference_code and currency:
-      1. Filter the DataFrame for this reference_code and currency.
-      2. Train a mini-model (LinearRegression) to predict price_eur based on date.
-      3. Forecast the future price (30 days after the last known date).
-      4. Calculate the difference (potential benefit) between the last known price and the forecast.
-      5. Return the forecasted price in the selected currency and in euros, and the value of this benefit.
+UNSAFE_FILENAME_CHARS = re.compile(r'[^\w.-]')
 
-    Parameters
-    ----------
-    df : pd.DataFrame
-        The DataFrame containing at least the following columns:
-          - 'reference_code'
-          - 'price_eur'
-          - 'currency'
-          - 'life_span_date' (format DD/MM/YYYY or YYYY-MM-DD, etc.)
-    reference_code : str
-        The reference code to analyze.
-    currency : str
-        The currency to analyze.
+@dataclass(frozen=True)
+class ForecastResult:
+    """
+    Forecast of one reference in one currency, with the observations it was fitted on.
+    Pure data: it can be checkpointed, sent to other processes and rendered later.
+    """
+    reference_code: str
+    currency: str
+    forecast_date: pd.Timestamp
+    forecast_price_eur: float
+    last_price_eur: float
+    benefit: float
+    dates: np.ndarray
+    prices: np.ndarray
+    # Regression line at the first and last observation dates
+    trend_prices: tuple
 
-    Returns
-    -------
-    (forecast_price_currency, forecast_price_eur, benefit)
-        forecast_price_currency : float
-            The forecasted price in the selected currency.
-        forecast_price_eur : float
-            The forecasted price in euros.
-        benefit : float
-            The value of this potential benefit in euros.
-        If no result, returns None.
+def _fit_forecast(df_filtered, reference_code, currency):
     """
-    # Filter by reference_code and currency
-    df_filtered = df[(df['reference_code'] == reference_code) & (df['currency'] == currency)].copy()
-    if df_filtered.empty:
-        print(f"No data for reference_code: {reference_code} and currency: {currency}")
-        return None
-    
+    Fit the regression on the observations of one reference and currency.
+    Returns None with fewer than two usable observations.
+    """
+    df_filtered = df_filtered.copy()
+
     # Convert life_span_date to datetime
     df_filtered['date_dt'] = pd.to_datetime(df_filtered['life_span_date'], dayfirst=True, errors='coerce')
-    
+
     # Drop rows where date couldn't be parsed
     df_filtered.dropna(subset=['date_dt'], inplace=True)
-    
+
     # Ensure price_eur is numeric
     df_filtered['price_eur'] = pd.to_numeric(df_filtered['price_eur'], errors='coerce')
     df_filtered.dropna(subset=['price_eur'], inplace=True)
-    
+
     # Sort by date
     df_filtered = df_filtered.sort_values(by='date_dt')
-    
+
     # Skip if only one data point
     if len(df_filtered) < 2:
-        print(f"Not enough data points for reference_code: {reference_code} and currency: {currency}")
         return None
-    
+
     # Prepare X and y for regression
     df_filtered['date_ordinal'] = df_filtered['date_dt'].apply(datetime.toordinal)
     X = df_filtered[['date_ordinal']]
     y = df_filtered['price_eur']
-    
+
     # Train a simple linear regression
     model = LinearRegression()
     model.fit(X, y)
-    
+
     # Forecast 30 days after the last known date
     last_date_ordinal = df_filtered['date_ordinal'].max()
     forecast_date_ordinal = last_date_ordinal + 30
-    
+
     # Convert forecast date to DataFrame
     forecast_date_df = pd.DataFrame({'date_ordinal': [forecast_date_ordinal]})
-    
+
     # Prediction
     forecast_price_eur = model.predict(forecast_date_df)[0]
-    
+
     # Last known price
     last_price = df_filtered.iloc[-1]['price_eur']
-    
-    # Potential benefit
-    benefit = forecast_price_eur - last_price
-    
-    # Display result
-    print(f"Forecasted price in {currency}: {forecast_price_eur:.2f} EUR")
-    print(f"Potential benefit (forecast): {benefit:.2f} EUR")
-    print(f"Details: last known price = {last_price:.2f} EUR, predicted price = {forecast_price_eur:.2f} EUR")
-    
-    # Plot the data and the regression line
-    plt.figure(figsize=(10, 6))
-    plt.scatter(df_filtered['date_dt'], df_filtered['price_eur'], color='blue', label='Actual Prices')
-    plt.plot(df_filtered['date_dt'], model.predict(df_filtered[['date_ordinal']]), color='red', label='Regression Line')
-    plt.xlabel('Date')
-    plt.ylabel('Price in EUR')
-    plt.title(f'Price Prediction for {currency}')
-    plt.legend()
-    plt.grid(True)
+
+    # The regression line is straight: its two endpoints are enough to draw it
+    line = df_filtered.iloc[[0, -1]]
+
+    return ForecastResult(
+        reference_code=reference_code,
+        currency=currency,
+        forecast_date=pd.Timestamp(df_filtered['date_dt'].max()) + timedelta(days=30),
+        forecast_price_eur=float(forecast_price_eur),
+        last_price_eur=float(last_price),
+        benefit=float(forecast_price_eur - last_price),
+        dates=df_filtered['date_dt'].to_numpy(),
+        prices=df_filtered['price_eur'].to_numpy(dtype=float),
+        trend_prices=tuple(float(p) for p in model.predict(line[['date_ordinal']]))
+    )
+
+def forecast_price(df, reference_code, currency):
+    """
+    Train a mini-model (LinearRegression) on the prices of a reference in a
+    currency and forecast its price in euros 30 days after the last known date.
+    Nothing is drawn.
+
+    Returns:
+        ForecastResult or None if there is not enough data
+    """
+    df_filtered = df[(df['reference_code'] == reference_code) & (df['currency'] == currency)]
+    if df_filtered.empty:
+        print(f"No data for reference_code: {reference_code} and currency: {currency}")
+        return None
+    result = _fit_forecast(df_filtered, reference_code, currency)
+    if result is None:
+        print(f"Not enough data points for reference_code: {reference_code} and currency: {currency}")
+    return result
+
+def forecast_catalogue(df, currency, references=None):
+    """
+    Forecasts of every reference (or of `references`) in one currency.
+
+    Returns:
+        list: ForecastResult of each reference with enough data, by reference code
+    """
+    df_currency = df[df['currency'] == currency]
+    if references is not None:
+        df_currency = df_currency[df_currency['reference_code'].isin(references)]
+    results = []
+    for reference_code, group in df_currency.groupby('reference_code', sort=True):
+        result = _fit_forecast(group, reference_code, currency)
+        if result is not None:
+            results.append(result)
+    print(f"Forecasted {len(results)} references in {currency}")
+    return results
+
+def forecasts_frame(results):
+    """
+    One row per forecast, without the observations.
+    """
+    return pd.DataFrame([
+        {
+            'reference_code': result.reference_code,
+            'currency': result.currency,
+            'forecast_date': result.forecast_date,
+            'forecast_price_eur': result.forecast_price_eur,
+            'last_price_eur': result.last_price_eur,
+            'benefit_eur': result.benefit
+        }
+        for result in results
+    ])
+
+def draw_forecast(ax, result, max_points=None):
+    """
+    Draw the observed prices and the regression line of a forecast on `ax`.
+    `max_points` downsamples the plotted prices to about this many points (LTTB).
+    """
+    plot_data = pd.DataFrame({'date_dt': result.dates, 'price_eur': result.prices})
+    if max_points is not None:
+        plot_data = downsample_frame(plot_data, 'date_dt', 'price_eur', max_points)
+    ax.scatter(plot_data['date_dt'], plot_data['price_eur'], color='blue', label='Actual Prices')
+    ax.plot(result.dates[[0, -1]], result.trend_prices, color='red', label='Regression Line')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Price in EUR')
+    ax.set_title(f'Price Prediction for {result.currency}')
+    ax.legend()
+    ax.grid(True)
+    return ax
+
+def forecast_figure(result, max_points=None):
+    """
+    Forecast chart on its own non-interactive (Agg) figure. Uses no global
+    pyplot state, so figures can be built from any thread or process.
+    """
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    draw_forecast(figure.add_subplot(), result, max_points)
+    return figure
+
+def show_forecast(result, max_points=None):
+    """
+    Display a forecast chart in an interactive window (blocks until closed).
+    """
+    import matplotlib.pyplot as plt
+    _, ax = plt.subplots(figsize=(10, 6))
+    draw_forecast(ax, result, max_points)
     plt.show()
-    
-    return forecast_price_eur, benefit
+
+def _save_chart(result, path, max_points):
+    forecast_figure(result, max_points).savefig(path)
+    return path
+
+def save_forecast_charts(results, output_dir, max_points=1000, n_jobs=None, file_format='png'):
+    """
+    Write one chart file per forecast (<reference>_<currency>.<format>) into
+    `output_dir`, rendered on `n_jobs` processes (None for all cores).
+
+    Returns:
+        list: Paths of the chart files
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [
+        os.path.join(output_dir, f"{UNSAFE_FILENAME_CHARS.sub('_', result.reference_code)}_{result.currency}.{file_format}")
+        for result in results
+    ]
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs == 1 or len(results) <= 1:
+        return [_save_chart(result, path, max_points) for result, path in zip(results, paths)]
+    with ProcessPoolExecutor(max_workers=min(n_jobs, len(results))) as executor:
+        return list(executor.map(_save_chart, results, paths, [max_points] * len(results),
+                                 chunksize=max(1, len(results) // (n_jobs * 4))))
+
+def currency_forecast_benefit(df, reference_code, currency, show_plot=True, max_points=None):
+    """
+    For a given reference_code and currency:
+      1. Filter the DataFrame for this reference_code and currency.
+      2. Train a mini-model (LinearRegression) to predict price_eur based on date.
+      3. Forecast the future price (30 days after the last known date).
+      4. Calculate the difference (potential benefit) between the last known price and the forecast.
+      5. Return the forecasted price in the selected currency and in euros, and the value of this benefit.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The DataFrame containing at least the following columns:
+          - 'reference_code'
+          - 'price_eur'
+          - 'currency'
+          - 'life_span_date' (format DD/MM/YYYY or YYYY-MM-DD, etc.)
+    reference_code : str
+        The reference code to analyze.
+    currency : str
+        The currency to analyze.
+    show_plot : bool
+        Whether to display the regression plot (disable for headless runs).
+        Use forecast_price and forecast_figure to get the chart as a figure.
+    max_points : int, optional
+        Downsample the plotted prices to about this many points (LTTB).
+
+    Returns
+    -------
+    (forecast_price_eur, benefit)
+        forecast_price_eur : float
+            The forecasted price in euros.
+        benefit : float
+            The value of this potential benefit in euros.
+        If no result, returns None.
+    """
+    result = forecast_price(df, reference_code, currency)
+    if result is None:
+        return None
+
+    # Display result
+    print(f"Forecasted price in {currency}: {result.forecast_price_eur:.2f} EUR")
+    print(f"Potential benefit (forecast): {result.benefit:.2f} EUR")
+    print(f"Details: last known price = {result.last_price_eur:.2f} EUR, predicted price = {result.forecast_price_eur:.2f} EUR")
+
+    if show_plot:
+        show_forecast(result, max_points)
+
+    return result.forecast_price_eur, result.benefit
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import pandas as pd
+import pyarrow as pa
+
+# Strings stay in Arrow memory instead of being copied into Python objects.
+# pandas stores them as large_string, so they are published in that layout.
+STRING_TYPES = {
+    pa.large_string(): pd.StringDtype('pyarrow'),
+}
+
+def get_shared_path(brand='Panerai'):
+    """
+    Location of the published dataset of a brand (BDM_SHARED_DIR or bdm_analysis/shared/).
+    """
+    shared_dir = os.getenv('BDM_SHARED_DIR')
+    if shared_dir is None:
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        shared_dir = os.path.join(script_dir, 'shared')
+    return os.path.join(shared_dir, f'brand={brand}', 'clean_data.arrow')
+
+def publish_dataset(df, path):
+    """
+    Publish a cleaned dataset as an uncompressed Arrow IPC file that readers can memory-map.
+
+    The file is written under a temporary name and renamed into place, so
+    readers see either the previous or the new dataset, never a partial one,
+    and sessions already attached keep their mapping of the old file.
+
+    Returns:
+        str: Path of the published file
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.cast(pa.schema([
+        field.with_type(pa.large_string()) if pa.types.is_string(field.type) else field
+        for field in table.schema
+    ], metadata=table.schema.metadata))
+    # A single record batch, so that no column needs concatenating (copying) on attach
+    table = table.combine_chunks()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+    print(f"Published {len(df)} rows to {path}")
+    return path
+
+def attach_dataset(path):
+    """
+    Attach to a published dataset without deserialising it.
+
+    The file is memory-mapped: numeric and date columns without missing
+    values, and string columns (Arrow-backed), point into the mapping
+    instead of being copied. Every process attached to the same file
+    shares one physical copy through the OS page cache.
+
+    Returns:
+        pd.DataFrame: The dataset
+    """
+    source = pa.memory_map(path, 'r')
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(split_blocks=True, types_mapper=STRING_TYPES.get)
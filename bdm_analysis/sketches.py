@@ -0,0 +1,334 @@
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+from concurrent.futures import ProcessPoolExecutor
+
+SUMMARY_COLUMNS = ['reference_code', 'collection', 'currency', 'life_span_date', 'price_eur']
+
+def _hash_values(values):
+    """
+    64-bit hashes of the non-null values of a column, stable across processes.
+    """
+    values = pd.Series(values).dropna()
+    if pd.api.types.is_datetime64_any_dtype(values):
+        values = values.dt.tz_localize(None) if values.dt.tz is not None else values
+        values = values.astype('datetime64[ns]').astype('int64')
+    elif not pd.api.types.is_numeric_dtype(values):
+        values = values.astype(str).astype(object)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+def _bit_length(x):
+    """
+    Number of significant bits of each uint64, without going through floats.
+    """
+    x = x.copy()
+    length = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = x >= (np.uint64(1) << np.uint64(shift))
+        length[high] += shift
+        x[high] >>= np.uint64(shift)
+    return length + (x > 0)
+
+class HyperLogLog:
+    """
+    Distinct count sketch. Uses 2**precision one-byte registers; the
+    relative standard error is 1.04 / sqrt(2**precision) (0.8% at 14).
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        hashes = _hash_values(values)
+        if len(hashes) == 0:
+            return self
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.int64)
+        # Rank of the first set bit in the remaining bits, capped by a sentinel bit
+        remaining = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+        rank = (65 - _bit_length(remaining)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(float)))
+        empty = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and empty:
+            # Linear counting is more accurate for small cardinalities
+            estimate = m * np.log(m / empty)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self):
+        return float(1.04 / np.sqrt(len(self.registers)))
+
+class QuantileSketch:
+    """
+    Quantiles of positive values with a relative accuracy guarantee
+    (logarithmic buckets, as in DDSketch). Memory grows with the log of the
+    value range, not with the number of values.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.counts = pd.Series(dtype='int64')
+        self.non_positive = 0
+
+    def update(self, values):
+        values = pd.Series(values).dropna().to_numpy(dtype=float)
+        positive = values[values > 0]
+        self.non_positive += len(values) - len(positive)
+        if len(positive):
+            keys = np.ceil(np.log(positive) / np.log(self.gamma)).astype(np.int64)
+            keys, counts = np.unique(keys, return_counts=True)
+            self.counts = self.counts.add(pd.Series(counts, index=keys), fill_value=0).astype('int64')
+        return self
+
+    def merge(self, other):
+        self.counts = self.counts.add(other.counts, fill_value=0).astype('int64')
+        self.non_positive += other.non_positive
+        return self
+
+    def quantile(self, q):
+        total = int(self.counts.sum()) + self.non_positive
+        if total == 0:
+            return np.nan
+        rank = q * (total - 1)
+        if rank < self.non_positive:
+            return 0.0
+        counts = self.counts.sort_index()
+        position = np.searchsorted(np.cumsum(counts.to_numpy()), rank - self.non_positive, side='right')
+        key = counts.index[min(position, len(counts) - 1)]
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+class Moments:
+    """
+    Count, mean, variance (Welford / Chan et al. pairwise merge), min and max.
+    Exact up to floating-point rounding.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @classmethod
+    def from_stats(cls, n, mean, m2, minimum, maximum):
+        moments = cls()
+        moments.n, moments.mean, moments.m2 = int(n), float(mean), float(m2)
+        moments.min, moments.max = float(minimum), float(maximum)
+        return moments
+
+    def update(self, values):
+        values = pd.Series(values).dropna().to_numpy(dtype=float)
+        if len(values):
+            mean = values.mean()
+            self.merge(Moments.from_stats(len(values), mean, ((values - mean) ** 2).sum(),
+                                          values.min(), values.max()))
+        return self
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+class FrequentItems:
+    """
+    Misra-Gries heavy hitters with at most `max_items` counters.
+    Counts are under-estimated by at most `error`, and `error` <= n / (max_items + 1).
+    """
+
+    def __init__(self, max_items=1000):
+        self.max_items = max_items
+        self.counts = pd.Series(dtype='int64')
+        self.error = 0
+
+    def update(self, values):
+        return self._add(pd.Series(values).dropna().value_counts())
+
+    def merge(self, other):
+        self.error += other.error
+        return self._add(other.counts)
+
+    def _add(self, counts):
+        self.counts = self.counts.add(counts, fill_value=0).astype('int64')
+        if len(self.counts) > self.max_items:
+            cutoff = int(self.counts.nlargest(self.max_items + 1).iloc[-1])
+            self.counts = self.counts[self.counts > cutoff] - cutoff
+            self.error += cutoff
+        return self
+
+    def most_common(self):
+        # Ties are broken by value, like Series.mode()
+        if self.counts.empty:
+            return None
+        counts = self.counts.sort_index()
+        return counts.idxmax()
+
+class StreamingSummary:
+    """
+    Approximate, constant-memory versions of generate_summary_stats,
+    verify_dataset_metrics and analyze_collections. Feed it chunks with
+    update(), combine summaries built by other workers with merge().
+    """
+
+    def __init__(self, hll_precision=14, relative_accuracy=0.01, max_items=1000):
+        self.rows = 0
+        self.distinct = {column: HyperLogLog(hll_precision)
+                         for column in ['reference_code', 'collection', 'currency', 'life_span_date']}
+        self.price = Moments()
+        self.price_quantiles = QuantileSketch(relative_accuracy)
+        self.collections = FrequentItems(max_items)
+        # One set of moments per collection: memory grows with collections, not rows
+        self.collection_prices = {}
+        self.date_min = pd.NaT
+        self.date_max = pd.NaT
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for column, sketch in self.distinct.items():
+            sketch.update(chunk[column])
+        self.price.update(chunk['price_eur'])
+        self.price_quantiles.update(chunk['price_eur'])
+        self.collections.update(chunk['collection'])
+
+        groups = chunk.groupby('collection')['price_eur']
+        stats = groups.agg(['count', 'mean', 'var', 'min', 'max'])
+        stats['m2'] = stats['var'].fillna(0) * (stats['count'] - 1)
+        for collection, row in stats[stats['count'] > 0].iterrows():
+            chunk_moments = Moments.from_stats(row['count'], row['mean'], row['m2'], row['min'], row['max'])
+            self.collection_prices.setdefault(collection, Moments()).merge(chunk_moments)
+
+        dates = pd.to_datetime(chunk['life_span_date'])
+        self.date_min = min(filter(pd.notna, [self.date_min, dates.min()]), default=pd.NaT)
+        self.date_max = max(filter(pd.notna, [self.date_max, dates.max()]), default=pd.NaT)
+        return self
+
+    def merge(self, other):
+        self.rows += other.rows
+        for column, sketch in self.distinct.items():
+            sketch.merge(other.distinct[column])
+        self.price.merge(other.price)
+        self.price_quantiles.merge(other.price_quantiles)
+        self.collections.merge(other.collections)
+        for collection, moments in other.collection_prices.items():
+            self.collection_prices.setdefault(collection, Moments()).merge(moments)
+        self.date_min = min(filter(pd.notna, [self.date_min, other.date_min]), default=pd.NaT)
+        self.date_max = max(filter(pd.notna, [self.date_max, other.date_max]), default=pd.NaT)
+        return self
+
+    def error_bounds(self):
+        """
+        Error guarantees of the approximate figures.
+        """
+        return {
+            'distinct_counts_relative_std_error': self.distinct['reference_code'].relative_error,
+            'price_quantiles_relative_error': self.price_quantiles.relative_accuracy,
+            'most_common_collection_count_error': self.collections.error,
+            'moments': 'exact'
+        }
+
+    def summary_stats(self):
+        """
+        Approximate generate_summary_stats, with price quantiles and error bounds.
+        """
+        return {
+            'total_models': self.distinct['reference_code'].count(),
+            'total_collections': self.distinct['collection'].count(),
+            'avg_price_eur': round(self.price.mean, 2),
+            'price_range_eur': f"{self.price.min:.2f} - {self.price.max:.2f}",
+            'median_price_eur': round(float(self.price_quantiles.quantile(0.5)), 2),
+            'p95_price_eur': round(float(self.price_quantiles.quantile(0.95)), 2),
+            'most_common_collection': self.collections.most_common(),
+            'date_range': f"{self.date_min} - {self.date_max}",
+            'error_bounds': self.error_bounds()
+        }
+
+    def dataset_metrics(self):
+        """
+        Approximate verify_dataset_metrics counts.
+        """
+        return {
+            'n_references': self.distinct['reference_code'].count(),
+            'n_currencies': self.distinct['currency'].count(),
+            'n_dates': self.distinct['life_span_date'].count()
+        }
+
+    def collection_stats(self):
+        """
+        analyze_collections computed from the per-collection moments.
+        """
+        stats = pd.DataFrame([
+            {
+                'collection': collection,
+                'model_count': moments.n,
+                'avg_price_eur': moments.mean,
+                'min_price_eur': moments.min,
+                'max_price_eur': moments.max,
+                'price_std_eur': moments.std
+            }
+            for collection, moments in sorted(self.collection_prices.items())
+        ])
+        return stats.round(2)
+
+def summarize_frame(df, chunk_size=100_000, **kwargs):
+    """
+    Streaming summary of an in-memory DataFrame, one chunk at a time.
+    """
+    summary = StreamingSummary(**kwargs)
+    for start in range(0, len(df), chunk_size):
+        summary.update(df.iloc[start:start + chunk_size])
+    return summary
+
+def _summarize_row_groups(path, row_groups, batch_size, transform, columns, kwargs):
+    summary = StreamingSummary(**kwargs)
+    parquet_file = pq.ParquetFile(path)
+    for batch in parquet_file.iter_batches(batch_size=batch_size, row_groups=row_groups, columns=columns):
+        chunk = batch.to_pandas()
+        summary.update(chunk if transform is None else transform(chunk))
+    return summary
+
+def summarize_parquet(path, n_jobs=1, batch_size=100_000, transform=None, extra_columns=(), **kwargs):
+    """
+    Streaming summary of a Parquet snapshot in one pass, without loading it.
+    Row groups are spread across `n_jobs` processes and the partial summaries merged.
+    `transform` (a picklable function of a DataFrame, e.g. row filters) is
+    applied to each batch before it is summarized; `extra_columns` are the
+    columns it needs besides the summarized ones.
+    """
+    columns = SUMMARY_COLUMNS + [column for column in extra_columns if column not in SUMMARY_COLUMNS]
+    n_row_groups = pq.ParquetFile(path).num_row_groups
+    n_jobs = max(1, min(n_jobs, n_row_groups))
+    assignments = [list(range(worker, n_row_groups, n_jobs)) for worker in range(n_jobs)]
+    if n_jobs == 1:
+        return _summarize_row_groups(path, assignments[0], batch_size, transform, columns, kwargs)
+
+    with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+        partials = list(executor.map(_summarize_row_groups, [path] * n_jobs, assignments,
+                                     [batch_size] * n_jobs, [transform] * n_jobs, [columns] * n_jobs,
+                                     [kwargs] * n_jobs))
+    summary = partials[0]
+    for partial in partials[1:]:
+        summary.merge(partial)
+    return summary
@@ -1,11 +1,26 @@
+import os
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
 import streamlit as st
 import pandas as pd
 from bdm_analysis.load_data import load_data_from_bigquery
 from bdm_analysis.clean_data import clean_data
-from bdm_analysis.arbitrage_analysis import calculate_arbitrage_opportunities
-from bdm_analysis.predicting_algo import currency_forecast_benefit
+from bdm_analysis.arbitrage_analysis import MAIN_CURRENCIES, MAX_PROFIT_PERCENTAGE
+from bdm_analysis.downsampling import paginate
+from bdm_analysis.shared_dataset import get_shared_path, publish_dataset, attach_dataset
+from bdm_analysis.background import (
+    BackgroundJob, reference_batches, arbitrage_batch, combine_opportunities, forecast_job
+)
 import plotly.express as px
-import matplotlib.pyplot as plt
+
+# Upper bounds on what is sent to the browser, whatever the data size
+MAX_CHART_POINTS = 1000
+PAGE_SIZES = [10, 25, 50, 100]
+
+# Background computations: references per arbitrage batch, seconds between refreshes
+ARBITRAGE_BATCH_SIZE = 20
+POLL_SECONDS = 1.0
 
 # Page configuration
 st.set_page_config(
@@ -45,18 +60,273 @@ st.markdown("""
     </style>
     """, unsafe_allow_html=True)
 
-@st.cache_data
 def load_and_clean_data():
     raw_df = load_data_from_bigquery()
     if raw_df is not None and not raw_df.empty:
         return clean_data(raw_df)
     return None
 
+@st.cache_resource(max_entries=1)
+def attach_shared_data(path, version):
+    """
+    Memory-map the published dataset once per process; every session shares it.
+    `version` (the file modification time) re-attaches after a new publish,
+    and the mapping of the replaced file is released (only one entry is kept).
+    """
+    return attach_dataset(path)
+
+def get_data():
+    """
+    Cleaned dataset shared by all sessions and workers on this host.
+    Published by the pipeline (`--stages load clean publish`), or by the
+    first session if nothing has been published yet.
+
+    Returns:
+        tuple: (dataset or None, path of the published file, its version)
+    """
+    path = get_shared_path()
+    if not os.path.exists(path):
+        df = load_and_clean_data()
+        if df is None:
+            return None, path, None
+        publish_dataset(df, path)
+    version = os.stat(path).st_mtime_ns
+    return attach_shared_data(path, version), path, version
+
+@st.cache_resource
+def get_executor():
+    """
+    Worker processes shared by all sessions. They attach the published
+    dataset themselves, so only reference codes and results cross processes.
+    """
+    return ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('spawn'))
+
+def start_job(name, key, function, batches):
+    """
+    Background job `name` of this session for inputs `key`. A running job
+    for other inputs is cancelled and replaced.
+    """
+    job = st.session_state.get(name)
+    if job is not None and job.key == key:
+        return job
+    if job is not None:
+        job.cancel()
+    job = BackgroundJob(get_executor(), function, batches, key)
+    st.session_state[name] = job
+    return job
+
+@st.cache_resource
+def shared_jobs():
+    """
+    Background jobs shared by all sessions, by name, and the lock that
+    guards them (sessions run on their own threads).
+    """
+    return {}, threading.Lock()
+
+def start_shared_job(name, key, function, make_batches):
+    """
+    Background job `name` shared by every session, for inputs `key`
+    (e.g. the dataset version). A job for other inputs is cancelled and
+    replaced; `make_batches()` is only called when a job is started.
+    """
+    jobs, lock = shared_jobs()
+    with lock:
+        job = jobs.get(name)
+        if job is None or job.key != key:
+            if job is not None:
+                job.cancel()
+            job = BackgroundJob(get_executor(), function, make_batches(), key)
+            jobs[name] = job
+    return job
+
+def cancel_job(name):
+    job = st.session_state.pop(name, None)
+    if job is not None:
+        job.cancel()
+
+def show_arbitrage(job):
+    """
+    Arbitrage results of the batches finished so far; refreshes itself until all are.
+    """
+    if job.done():
+        render_arbitrage(job)
+    else:
+        poll_arbitrage(job)
+
+@st.fragment(run_every=POLL_SECONDS)
+def poll_arbitrage(job):
+    if job.done():
+        # Full rerun, which renders the final results without polling
+        st.rerun()
+    n_finished = len(job.finished())
+    st.progress(job.progress(), text=f"Calculating arbitrage opportunities... "
+                                     f"{n_finished}/{len(job.futures)} reference batches")
+    render_arbitrage(job)
+
+def render_arbitrage(job):
+    for error in job.errors():
+        st.error(f"Arbitrage calculation error: {error}")
+    opportunities = combine_opportunities(job.results())
+    complete = job.done()
+
+    if not opportunities.empty:
+        # Filters
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            min_profit = st.slider(
+                "Minimum Profit (%)", 
+                min_value=0.0, 
+                max_value=float(MAX_PROFIT_PERCENTAGE), 
+                value=2.0,
+                step=0.5
+            )
+        with col2:
+            selected_direction = st.selectbox(
+                "Arbitrage Direction",
+                ["All", "EUR->Foreign", "Foreign->EUR"]
+            )
+        with col3:
+            selected_currency = st.selectbox(
+                "Currency",
+                # Fixed options, so the selection survives the arrival of new batches
+                ["All"] + MAIN_CURRENCIES
+            )
+        
+        # Filter data
+        filtered_opps = opportunities[
+            opportunities['profit_percentage'] >= min_profit
+        ]
+        if selected_direction != "All":
+            filtered_opps = filtered_opps[
+                filtered_opps['arbitrage_direction'] == selected_direction
+            ]
+        if selected_currency != "All":
+            filtered_opps = filtered_opps[
+                (filtered_opps['buy_currency'] == selected_currency) |
+                (filtered_opps['sell_currency'] == selected_currency)
+            ]
+        
+        # Key metrics
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric(
+                "Number of Opportunities", 
+                len(filtered_opps)
+            )
+        with col2:
+            st.metric(
+                "Average Profit (EUR)", 
+                f"€{filtered_opps['potential_profit_eur'].mean():,.2f}"
+            )
+        with col3:
+            st.metric(
+                "Average Profit (%)", 
+                f"{filtered_opps['profit_percentage'].mean():.1f}%"
+            )
+        with col4:
+            st.metric(
+                "Maximum Profit (EUR)", 
+                f"€{filtered_opps['potential_profit_eur'].max():,.2f}"
+            )
+        
+        # Opportunities by currency chart (aggregated server-side: one bar per currency)
+        currency_profits = filtered_opps.groupby('sell_currency')[
+            'potential_profit_eur'
+        ].mean().reset_index()
+        
+        fig = px.bar(
+            currency_profits,
+            x='sell_currency',
+            y='potential_profit_eur',
+            title='Average Profit by Currency',
+            labels={
+                'sell_currency': 'Currency',
+                'potential_profit_eur': 'Average Profit (EUR)'
+            }
+        )
+        st.plotly_chart(fig, use_container_width=True)
+        
+        # Opportunities table, one page at a time
+        st.subheader("Top Arbitrage Opportunities")
+        col1, col2 = st.columns(2)
+        with col1:
+            page_size = st.selectbox("Rows per page", PAGE_SIZES)
+        with col2:
+            # Stable key and no max_value: the page survives the arrival of new batches
+            page = st.number_input("Page", min_value=1, value=1, step=1, key='arbitrage_page')
+        ranked_opps = filtered_opps.sort_values('potential_profit_eur', ascending=False)
+        page_opps, n_pages = paginate(ranked_opps, int(page), page_size)
+        page = min(int(page), n_pages)
+        styled_opps = page_opps[[
+            'reference_code', 
+            'buy_currency', 
+            'sell_currency', 
+            'potential_profit_eur',
+            'profit_percentage',
+            'date'
+        ]].copy()
+        styled_opps.columns = [
+            'Reference', 
+            'Buy Currency', 
+            'Sell Currency', 
+            'Profit (EUR)',
+            'Profit (%)',
+            'Date'
+        ]
+        styled_opps['Profit (EUR)'] = styled_opps['Profit (EUR)'].round(2)
+        styled_opps['Profit (%)'] = styled_opps['Profit (%)'].round(2)
+        st.dataframe(
+            styled_opps,
+            use_container_width=True,
+            hide_index=True
+        )
+        st.caption(f"Page {page} of {n_pages} ({len(filtered_opps)} opportunities"
+                   f"{'' if complete else ' so far'})")
+    elif complete:
+        st.warning("No arbitrage opportunities found.")
+    else:
+        st.info("No arbitrage opportunities found yet.")
+
+def show_forecast(job):
+    if job.done():
+        render_forecast(job)
+    else:
+        poll_forecast(job)
+
+@st.fragment(run_every=POLL_SECONDS)
+def poll_forecast(job):
+    if job.done():
+        st.rerun()
+    st.progress(job.progress(), text="Calculating predictions...")
+
+def render_forecast(job):
+    for error in job.errors():
+        st.error(f"Analysis error: {str(error)}")
+    for result, chart in job.results():
+        if result:
+            # Display results in metrics
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric(
+                    "Forecasted Price (EUR)", 
+                    f"€{result.forecast_price_eur:,.2f}"
+                )
+            with col2:
+                st.metric(
+                    "Potential Benefit", 
+                    f"€{result.benefit:,.2f}"
+                )
+            
+            # Chart rendered off-screen by the worker
+            st.image(chart, use_container_width=True)
+        else:
+            st.warning("Not enough data for this reference and currency combination.")
+
 def main():
     st.title("🎯 Panerai Market Analysis Dashboard")
     
     with st.spinner('Loading data...'):
-        df = load_and_clean_data()
+        df, path, version = get_data()
     
     if df is None:
         st.error("❌ Error loading data.")
@@ -68,113 +338,12 @@ def main():
     with tab1:
         st.header("Arbitrage Opportunities")
         
-        with st.spinner('Calculating arbitrage opportunities...'):
-            opportunities = calculate_arbitrage_opportunities(df)
-        
-        if not opportunities.empty:
-            # Filters
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                min_profit = st.slider(
-                    "Minimum Profit (%)", 
-                    min_value=0.0, 
-                    max_value=15.0, 
-                    value=2.0,
-                    step=0.5
-                )
-            with col2:
-                selected_direction = st.selectbox(
-                    "Arbitrage Direction",
-                    ["All", "EUR->Foreign", "Foreign->EUR"]
-                )
-            with col3:
-                selected_currency = st.selectbox(
-                    "Currency",
-                    ["All"] + list(opportunities['buy_currency'].unique())
-                )
-            
-            # Filter data
-            filtered_opps = opportunities[
-                opportunities['profit_percentage'] >= min_profit
-            ]
-            if selected_direction != "All":
-                filtered_opps = filtered_opps[
-                    filtered_opps['arbitrage_direction'] == selected_direction
-                ]
-            if selected_currency != "All":
-                filtered_opps = filtered_opps[
-                    (filtered_opps['buy_currency'] == selected_currency) |
-                    (filtered_opps['sell_currency'] == selected_currency)
-                ]
-            
-            # Key metrics
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric(
-                    "Number of Opportunities", 
-                    len(filtered_opps)
-                )
-            with col2:
-                st.metric(
-                    "Average Profit (EUR)", 
-                    f"€{filtered_opps['potential_profit_eur'].mean():,.2f}"
-                )
-            with col3:
-                st.metric(
-                    "Average Profit (%)", 
-                    f"{filtered_opps['profit_percentage'].mean():.1f}%"
-                )
-            with col4:
-                st.metric(
-                    "Maximum Profit (EUR)", 
-                    f"€{filtered_opps['potential_profit_eur'].max():,.2f}"
-                )
-            
-            # Opportunities by currency chart
-            currency_profits = filtered_opps.groupby('sell_currency')[
-                'potential_profit_eur'
-            ].mean().reset_index()
-            
-            fig = px.bar(
-                currency_profits,
-                x='sell_currency',
-                y='potential_profit_eur',
-                title='Average Profit by Currency',
-                labels={
-                    'sell_currency': 'Currency',
-                    'potential_profit_eur': 'Average Profit (EUR)'
-                }
-            )
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Top opportunities table
-            st.subheader("Top Arbitrage Opportunities")
-            top_opps = filtered_opps.nlargest(10, 'potential_profit_eur')
-            styled_opps = top_opps[[
-                'reference_code', 
-                'buy_currency', 
-                'sell_currency', 
-                'potential_profit_eur',
-                'profit_percentage',
-                'date'
-            ]].copy()
-            styled_opps.columns = [
-                'Reference', 
-                'Buy Currency', 
-                'Sell Currency', 
-                'Profit (EUR)',
-                'Profit (%)',
-                'Date'
-            ]
-            styled_opps['Profit (EUR)'] = styled_opps['Profit (EUR)'].round(2)
-            styled_opps['Profit (%)'] = styled_opps['Profit (%)'].round(2)
-            st.dataframe(
-                styled_opps,
-                use_container_width=True,
-                hide_index=True
-            )
-        else:
-            st.warning("No arbitrage opportunities found.")
+        # Computed in the background, batch by batch, once per dataset version for all
+        # sessions; restarted when a new dataset is published
+        show_arbitrage(start_shared_job(
+            'arbitrage', version, arbitrage_batch,
+            lambda: [(path, references) for references in reference_batches(df, ARBITRAGE_BATCH_SIZE)]
+        ))
     
     # Price Predictions Tab
     with tab2:
@@ -197,34 +366,16 @@ def main():
                 currencies
             )
         
+        inputs = (version, selected_ref, selected_currency)
         if st.button("Analyze"):
-            with st.spinner('Calculating predictions...'):
-                try:
-                    result = currency_forecast_benefit(df, selected_ref, selected_currency)
-                    if result:
-                        forecast_price_eur, benefit = result
-                        
-                        # Display results in metrics
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            st.metric(
-                                "Forecasted Price (EUR)", 
-                                f"€{forecast_price_eur:,.2f}"
-                            )
-                        with col2:
-                            st.metric(
-                                "Potential Benefit", 
-                                f"€{benefit:,.2f}"
-                            )
-                        
-                        # Capture and display the current figure
-                        current_fig = plt.gcf()
-                        st.pyplot(current_fig)
-                        plt.close()  # Clean up the figure
-                    else:
-                        st.warning("Not enough data for this reference and currency combination.")
-                except Exception as e:
-                    st.error(f"Analysis error: {str(e)}")
+            start_job('forecast_job', inputs, forecast_job,
+                      [(path, selected_ref, selected_currency, MAX_CHART_POINTS)])
+        job = st.session_state.get('forecast_job')
+        if job is not None and job.key != inputs:
+            # Selection changed: the running forecast is no longer wanted
+            cancel_job('forecast_job')
+        elif job is not None:
+            show_forecast(job)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+# EUR value of one unit of each currency, around which daily rates move
+BASE_RATES = {
+    'EUR': 1.0, 'USD': 0.95, 'GBP': 1.17, 'CHF': 0.99, 'JPY': 0.0073,
+    'SGD': 0.69, 'CNY': 0.14, 'AED': 0.26, 'HKD': 0.11
+}
+
+def make_clean_prices(n_refs=8, n_days=60, seed=0):
+    """
+    Small cleaned dataset shaped like clean_data's output: step-wise local
+    prices with gaps, a daily rate per (currency, day), some rows converted at
+    a fallback rate, a few duplicated same-day observations, shuffled rows
+    and a duplicated index.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2022-03-01', periods=n_days, freq='D')
+    day_rates = {
+        currency: rate * (1 + np.cumsum(rng.normal(0, 0.002, n_days))) if currency != 'EUR' else np.ones(n_days)
+        for currency, rate in BASE_RATES.items()
+    }
+    rows = []
+    for r in range(n_refs):
+        base = rng.uniform(3000, 40000)
+        for currency, rate in BASE_RATES.items():
+            price = round(base / rate * rng.uniform(0.92, 1.08))
+            for day in range(n_days):
+                if rng.random() < 0.1:
+                    continue
+                if rng.random() < 0.05:
+                    price = round(price * rng.uniform(0.9, 1.1))
+                fallback = currency != 'EUR' and rng.random() < 0.05
+                conversion_rate = rate if fallback else day_rates[currency][day]
+                row = {
+                    'brand': 'Panerai', 'reference_code': f'PAM{r:05d}', 'collection': f'Coll{r % 3}',
+                    'currency': currency, 'price': float(price), 'life_span_date': dates[day],
+                    'price_eur': price * conversion_rate
+                }
+                rows.append(row)
+                if rng.random() < 0.01:
+                    rows.append({**row, 'price': row['price'] * 1.02, 'price_eur': row['price_eur'] * 1.02})
+    df = pd.DataFrame(rows)
+    df['year'] = df['life_span_date'].dt.year
+    df['quarter'] = df['life_span_date'].dt.quarter
+    df = df.sample(frac=1, random_state=seed)
+    df.index = np.arange(len(df)) // 2
+    return df
+
+@pytest.fixture(scope='session')
+def clean_prices():
+    return make_clean_prices()
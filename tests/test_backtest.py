@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bdm_analysis.arbitrage_analysis import calculate_arbitrage_opportunities
+from bdm_analysis.backtest import backtest_trades, run_backtest_grid
+
+@pytest.fixture(scope='module')
+def grid(clean_prices):
+    return run_backtest_grid(clean_prices, thresholds=[1.0, 3.0], holding_days=[0, 7, 30])
+
+@pytest.mark.parametrize('threshold', [1.0, 3.0])
+@pytest.mark.parametrize('holding_days', [0, 7, 30])
+def test_grid_matches_trades(clean_prices, grid, threshold, holding_days):
+    for currencies in [['USD'], ['JPY'], None]:
+        # None: the set of every foreign currency, the longest label
+        label = ','.join(currencies) if currencies else max(grid['currencies'], key=len)
+        row = grid[(grid['min_profit_percentage'] == threshold) & (grid['holding_days'] == holding_days)
+                   & (grid['currencies'] == label)].iloc[0]
+        trades = backtest_trades(clean_prices, threshold, holding_days, currencies)
+
+        assert row['n_trades'] == len(trades)
+        assert row['total_profit_eur'] == pytest.approx(trades['profit_eur'].sum(), rel=1e-9, abs=1e-6)
+        if len(trades):
+            assert row['avg_return_percentage'] == pytest.approx(trades['return_percentage'].mean(), rel=1e-9)
+            assert row['win_rate'] == pytest.approx((trades['profit_eur'] > 0).mean() * 100, rel=1e-9)
+        else:
+            assert np.isnan(row['avg_profit_eur'])
+
+def test_grid_does_not_depend_on_chunks(clean_prices, grid):
+    chunked = run_backtest_grid(clean_prices, thresholds=[1.0, 3.0], holding_days=[0, 7, 30], chunk_size=3)
+    columns = ['min_profit_percentage', 'holding_days', 'currencies']
+    pd.testing.assert_frame_equal(chunked.sort_values(columns).reset_index(drop=True),
+                                  grid.sort_values(columns).reset_index(drop=True), rtol=1e-9)
+
+def test_same_day_trades_match_arbitrage(clean_prices):
+    # Buying and selling on the signal day realizes exactly the detected opportunities
+    opportunities = calculate_arbitrage_opportunities(clean_prices)
+    trades = backtest_trades(clean_prices, min_profit_percentage=1.0, holding_days=0)
+    grid = run_backtest_grid(clean_prices, thresholds=[1.0], holding_days=[0])
+    # The set of every foreign currency has the longest label
+    everything = grid.loc[grid['currencies'].str.len().idxmax()]
+
+    assert len(opportunities) > 0
+    assert len(trades) == len(opportunities) == everything['n_trades']
+    assert trades['profit_eur'].sum() == pytest.approx(opportunities['potential_profit_eur'].sum(), rel=1e-9)
+    assert everything['total_profit_eur'] == pytest.approx(opportunities['potential_profit_eur'].sum(), rel=1e-9)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bdm_analysis.clean_data import clean_data, flag_price_outliers, get_fallback_rates
+
+def price_series(prices, reference='PAM00001', currency='EUR'):
+    return pd.DataFrame({
+        'reference_code': reference, 'currency': currency, 'price': prices,
+        'life_span_date': pd.date_range('2022-01-01', periods=len(prices), freq='D')
+    })
+
+def test_outliers_keep_step_change_and_flag_spikes():
+    # +30% for the last 145 days of the year, and two one-day spikes before it
+    prices = np.full(365, 10000.0)
+    prices[220:] = 13000.0
+    prices[[50, 150]] = [30000.0, 3000.0]
+    df = price_series(prices).sample(frac=1, random_state=0)
+
+    outliers = flag_price_outliers(df)
+    assert outliers.index.equals(df.index)
+    assert sorted(df.loc[outliers, 'life_span_date'].dt.dayofyear - 1) == [50, 150]
+
+def test_outliers_are_per_series():
+    # The same price is normal in JPY and a spike in EUR
+    df = pd.concat([price_series(np.full(30, 10000.0)), price_series(np.full(30, 1_400_000.0), currency='JPY')])
+    df.loc[df['currency'].eq('EUR') & (df['life_span_date'] == '2022-01-10'), 'price'] = 1_400_000.0
+    df = df.reset_index(drop=True)
+
+    outliers = flag_price_outliers(df)
+    assert outliers.sum() == 1
+    assert df.loc[outliers, 'currency'].tolist() == ['EUR']
+
+def test_short_series_are_not_flagged():
+    assert not flag_price_outliers(price_series([10000.0, 90000.0])).any()
+
+def make_raw_prices(n_refs=6, n_days=40, seed=0):
+    """
+    Raw rows shaped like the BigQuery extract: padded text fields, dates as
+    strings, several countries per currency, missing and invalid prices, and
+    scraped-URL collections whose dates use another format.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2022-03-01', periods=n_days, freq='D')
+    countries = {'EUR': ['FR', 'DE', 'IT'], 'USD': ['US'], 'GBP': ['GB'], 'JPY': ['JP'], 'CHF': ['CH'], 'HKD': ['HK']}
+    rows = [{
+        'brand': 'Panerai', 'reference_code': 'PAM99999', 'collection': 'HTTPS://EXAMPLE.COM',
+        'currency': 'EUR', 'country': 'FR', 'price': 5000.0, 'life_span_date': '01/03/2022', 'is_new': True
+    }]
+    for r in range(n_refs):
+        base = rng.uniform(3000, 40000)
+        for currency, currency_countries in countries.items():
+            rate = get_fallback_rates().get(currency, 1.0)
+            for country in currency_countries:
+                price = round(base / rate * rng.uniform(0.97, 1.03))
+                for day in rng.choice(n_days, n_days * 3 // 4, replace=False):
+                    rows.append({
+                        'brand': 'Panerai', 'reference_code': f' PAM{r:05d} ', 'collection': f'Coll{r % 3} ',
+                        'currency': currency.lower() if rng.random() < 0.1 else currency, 'country': country,
+                        'price': np.nan if rng.random() < 0.02 else price * (20 if rng.random() < 0.01 else 1),
+                        'life_span_date': dates[day].strftime('%Y-%m-%d'), 'is_new': False
+                    })
+    df = pd.DataFrame(rows)
+    df.loc[rng.choice(len(df), 5, replace=False)[1:], 'collection'] = 'HTTPS://EXAMPLE.COM/watch'
+    return df
+
+@pytest.mark.parametrize('outlier_threshold', [3.5, None])
+def test_parallel_matches_serial(outlier_threshold):
+    raw = make_raw_prices()
+    raw.index = np.arange(len(raw)) // 3
+    serial = clean_data(raw, outlier_threshold=outlier_threshold, n_jobs=1)
+    parallel = clean_data(raw, outlier_threshold=outlier_threshold, n_jobs=2)
+    assert len(serial) > len(raw) // 2
+    pd.testing.assert_frame_equal(parallel, serial)
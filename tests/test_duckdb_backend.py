@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+from bdm_analysis import analyze_data
+from bdm_analysis.arbitrage_analysis import calculate_arbitrage_opportunities
+from bdm_analysis.main import filter_data
+
+duckdb_backend = pytest.importorskip('bdm_analysis.duckdb_backend')
+
+@pytest.fixture(scope='module')
+def snapshot(clean_prices, tmp_path_factory):
+    path = tmp_path_factory.mktemp('duckdb') / 'clean_data.parquet'
+    clean_prices.to_parquet(path, index=False, row_group_size=1000)
+    return str(path)
+
+@pytest.fixture(scope='module')
+def con():
+    con = duckdb_backend.connect(threads=2)
+    yield con
+    con.close()
+
+def test_filters_match_filter_data(clean_prices, snapshot, con):
+    references = sorted(clean_prices['reference_code'].unique())[:3]
+    source = duckdb_backend.ParquetSource(snapshot, '2022-03-10', '2022-04-05', tuple(references), 'Panerai')
+    expected = filter_data(clean_prices.reset_index(drop=True), '2022-03-10', '2022-04-05', references)
+
+    assert duckdb_backend.count_rows(source, con) == len(expected)
+    pd.testing.assert_frame_equal(duckdb_backend.analyze_collections(source, con),
+                                  analyze_data.analyze_collections(expected), check_dtype=False)
+    assert duckdb_backend.generate_summary_stats(source, con) == analyze_data.generate_summary_stats(expected)
+
+def test_arbitrage_matches_pandas(clean_prices, snapshot, con):
+    expected = calculate_arbitrage_opportunities(clean_prices.reset_index(drop=True)).reset_index(drop=True)
+    result = duckdb_backend.calculate_arbitrage_opportunities(snapshot, con)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, rtol=1e-9)
@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bdm_analysis import analyze_data, interval_backend
+from bdm_analysis.arbitrage_analysis import calculate_arbitrage_opportunities
+
+@pytest.fixture(scope='module')
+def compressed(clean_prices):
+    return interval_backend.compress_prices(clean_prices)
+
+def sort_daily(df):
+    # Same-day observations of a series in price order, ties in input order
+    df = df.reset_index(drop=True)
+    by_price = df.sort_values('price', kind='stable')
+    slot = by_price.groupby(['reference_code', 'currency', 'life_span_date']).cumcount().reindex(df.index)
+    return (df.assign(_slot=slot)
+            .sort_values(['reference_code', 'currency', '_slot', 'life_span_date'], kind='stable')
+            .drop(columns='_slot').reset_index(drop=True))
+
+def test_expand_round_trip(clean_prices, compressed):
+    assert len(compressed.intervals) < len(clean_prices)
+    expanded = interval_backend.expand_intervals(compressed)
+    pd.testing.assert_frame_equal(expanded, sort_daily(clean_prices), check_dtype=False, rtol=1e-12)
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_same_day_sources_keep_their_runs(shuffle):
+    # 3 eurozone countries per reference, each at a constant price all year,
+    # and a USD price close enough to the EUR ones for arbitrage signals
+    dates = pd.date_range('2022-01-01', periods=120, freq='D')
+    rows = [
+        {'reference_code': f'PAM{r:05d}', 'collection': 'Luminor', 'currency': 'EUR',
+         'price': 10000.0 + 100 * r + 200 * country, 'price_eur': 10000.0 + 100 * r + 200 * country,
+         'life_span_date': date}
+        for date in dates for r in range(10) for country in range(3)
+    ]
+    rows += [
+        {'reference_code': f'PAM{r:05d}', 'collection': 'Luminor', 'currency': 'USD',
+         'price': 10800.0 + 100 * r, 'price_eur': (10800.0 + 100 * r) * 0.95, 'life_span_date': date}
+        for date in dates for r in range(10)
+    ]
+    df = pd.DataFrame(rows)
+    if shuffle:
+        df = df.sample(frac=1, random_state=0)
+    compressed = interval_backend.compress_prices(df)
+
+    assert len(compressed.intervals) == 40
+    pd.testing.assert_frame_equal(interval_backend.expand_intervals(compressed), sort_daily(df), check_dtype=False)
+    # The first observation of a day, used by arbitrage, still follows the input order
+    columns = ['reference_code', 'date', 'buy_currency', 'sell_currency']
+    expected = calculate_arbitrage_opportunities(df).sort_values(columns).reset_index(drop=True)
+    result = interval_backend.calculate_arbitrage_opportunities(compressed).sort_values(columns).reset_index(drop=True)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, rtol=1e-9)
+
+def test_fallback_rates_are_kept(clean_prices, compressed):
+    # Rows converted at another rate than their (currency, day) keep their own rate
+    assert compressed.intervals['fixed_rate'].notna().any()
+    expanded = interval_backend.expand_intervals(compressed)
+    rates = expanded['price_eur'] / expanded['price']
+    expected = sort_daily(clean_prices)
+    np.testing.assert_allclose(rates, expected['price_eur'] / expected['price'],
+                               rtol=interval_backend.RATE_TOLERANCE * 10)
+
+def test_rate_range_queries_match_brute_force(compressed):
+    rng = np.random.default_rng(1)
+    rates = compressed.rates
+    currencies = rates['currency'].to_numpy()[rng.integers(0, len(rates), 200)]
+    first, last = rates['date'].min(), rates['date'].max()
+    span = (last - first).days
+    starts = first + pd.to_timedelta(rng.integers(0, span + 1, 200), unit='D')
+    ends = starts + pd.to_timedelta(rng.integers(0, span + 1, 200), unit='D')
+    ends = ends.where(ends <= last, last)
+    fixed = np.full(200, np.nan)
+    fixed[::10] = 0.5
+
+    sums, squares, minimum, maximum = interval_backend._rate_stats(compressed, currencies, starts, ends, fixed)
+    table = rates.set_index(['currency', 'date'])['rate']
+    for i in range(200):
+        window = table.loc[currencies[i]]
+        window = window[(window.index >= starts[i]) & (window.index <= ends[i])]
+        if not np.isnan(fixed[i]):
+            n_days = (ends[i] - starts[i]).days + 1
+            window = pd.Series(np.full(n_days, fixed[i]))
+        assert sums[i] == pytest.approx(window.sum(), rel=1e-9)
+        assert squares[i] == pytest.approx((window ** 2).sum(), rel=1e-9)
+        assert minimum[i] == window.min()
+        assert maximum[i] == window.max()
+
+def test_collections_match_pandas(clean_prices, compressed):
+    pd.testing.assert_frame_equal(interval_backend.analyze_collections(compressed),
+                                  analyze_data.analyze_collections(clean_prices), check_dtype=False)
+
+def test_summary_stats_match_pandas(clean_prices, compressed):
+    assert interval_backend.generate_summary_stats(compressed) == \
+        analyze_data.generate_summary_stats(clean_prices)
+
+def test_time_trends_match_pandas(clean_prices, compressed):
+    pd.testing.assert_frame_equal(interval_backend.analyze_time_trends(compressed),
+                                  analyze_data.analyze_time_trends(clean_prices.copy()), check_dtype=False)
+
+def test_currency_variations_match_stable_pandas(clean_prices, compressed):
+    # The latest price of a reference is its last row on its last date, in input
+    # order. analyze_data sorts with an unstable sort, so only the other figures
+    # are compared with it.
+    expected = analyze_data.analyze_currency_variations(clean_prices.copy())
+    ordered = clean_prices.reset_index(drop=True).sort_values('life_span_date', kind='stable')
+    latest_prices = ordered.groupby('reference_code').tail(1)['price_eur']
+    expected.update({
+        'avg_eur_price': latest_prices.mean(),
+        'min_eur_price': latest_prices.min(),
+        'max_eur_price': latest_prices.max(),
+        'price_std_eur': latest_prices.std()
+    })
+    result = interval_backend.analyze_currency_variations(compressed)
+    assert result.keys() == expected.keys()
+    for key, value in expected.items():
+        assert result[key] == pytest.approx(value, rel=1e-12), key
+
+def test_arbitrage_matches_pandas(clean_prices, compressed):
+    columns = ['reference_code', 'date', 'buy_currency', 'sell_currency']
+    expected = calculate_arbitrage_opportunities(clean_prices).sort_values(columns).reset_index(drop=True)
+    result = interval_backend.calculate_arbitrage_opportunities(compressed).sort_values(columns).reset_index(drop=True)
+    assert len(expected) > 0
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False, rtol=1e-9)
@@ -0,0 +1,48 @@
+import subprocess
+import sys
+import pandas as pd
+import pytest
+from bdm_analysis.main import main, parse_args
+
+@pytest.fixture(scope='module')
+def snapshots(clean_prices, tmp_path_factory):
+    folder = tmp_path_factory.mktemp('snapshots')
+    both = pd.concat([clean_prices, clean_prices.assign(brand='Rolex')])
+    paths = {
+        'parquet': folder / 'clean_data.parquet',
+        'csv': folder / 'clean_data.csv',
+        'unbranded': folder / 'unbranded.parquet'
+    }
+    both.to_parquet(paths['parquet'], index=False)
+    both.to_csv(paths['csv'], index=False)
+    both.drop(columns='brand').to_parquet(paths['unbranded'], index=False)
+    return {name: str(path) for name, path in paths.items()}
+
+@pytest.mark.parametrize('snapshot', ['parquet', 'csv'])
+def test_all_brands_of_input(snapshots, snapshot):
+    assert parse_args(['--input', snapshots[snapshot], '--brands', 'all']).brands == ['Panerai', 'Rolex']
+
+@pytest.mark.parametrize('brands', [['all'], ['Panerai', 'Rolex']])
+def test_several_brands_need_a_brand_column(snapshots, brands):
+    with pytest.raises(SystemExit):
+        parse_args(['--input', snapshots['unbranded'], '--brands', *brands])
+    assert parse_args(['--input', snapshots['unbranded'], '--brands', 'Rolex']).brands == ['Rolex']
+
+def test_snapshot_keeps_the_cleaned_schema(clean_prices, tmp_path):
+    # The pandas analyses must not add their helper columns to the snapshot
+    clean_prices.to_parquet(tmp_path / 'input.parquet', index=False)
+    main(['--input', str(tmp_path / 'input.parquet'), '--stages', 'analyze', 'snapshot',
+          '--output-dir', str(tmp_path / 'out'), '--no-checkpoints'])
+    snapshot = pd.read_parquet(tmp_path / 'out' / 'brand=Panerai' / 'clean_data.parquet')
+    assert list(snapshot.columns) == list(clean_prices.columns)
+
+def test_analysis_of_cleaned_input_skips_cleaning_dependencies(clean_prices, tmp_path):
+    clean_prices.to_parquet(tmp_path / 'input.parquet', index=False)
+    script = (
+        "import sys\n"
+        "from bdm_analysis.main import main\n"
+        f"main(['--input', {str(tmp_path / 'input.parquet')!r}, '--stages', 'analyze', 'export', 'arbitrage',\n"
+        f"      '--output-dir', {str(tmp_path / 'out')!r}, '--no-checkpoints'])\n"
+        "assert 'currency_converter' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, '-c', script], check=True, capture_output=True)
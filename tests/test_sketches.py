@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+from bdm_analysis import analyze_data
+from bdm_analysis.sketches import (
+    FrequentItems, HyperLogLog, Moments, QuantileSketch, _bit_length, _hash_values, summarize_frame, summarize_parquet
+)
+
+def test_bit_length_matches_python():
+    values = np.array([0, 1, 2, 3, 255, 256, 2 ** 32 - 1, 2 ** 32, 2 ** 63, 2 ** 64 - 1], dtype=np.uint64)
+    rng = np.random.default_rng(0)
+    values = np.concatenate([values, rng.integers(0, 2 ** 63, 1000, dtype=np.uint64) << rng.integers(0, 2, 1000).astype(np.uint64)])
+    assert _bit_length(values).tolist() == [int(v).bit_length() for v in values]
+
+def test_hyperloglog_registers_match_definition():
+    # Register = max over its hashes of the 1-based position of the first set bit after the index bits
+    precision = 8
+    values = pd.Series([f'ref{i}' for i in range(5000)])
+    sketch = HyperLogLog(precision).update(values)
+    expected = np.zeros(1 << precision, dtype=np.uint8)
+    for h in _hash_values(values):
+        h = int(h)
+        index = h >> (64 - precision)
+        remaining = (h << precision) & (2 ** 64 - 1)
+        rank = min(64 - remaining.bit_length() + 1, 64 - precision + 1)
+        expected[index] = max(expected[index], rank)
+    np.testing.assert_array_equal(sketch.registers, expected)
+
+@pytest.mark.parametrize('n', [10, 1000, 100_000])
+def test_hyperloglog_count_within_error(n):
+    sketch = HyperLogLog(14).update(pd.Series(np.arange(n)).astype(str))
+    assert abs(sketch.count() - n) <= max(1, 4 * sketch.relative_error * n)
+
+def test_hyperloglog_merge_is_union():
+    a = HyperLogLog(12).update(pd.Series(range(0, 6000)))
+    b = HyperLogLog(12).update(pd.Series(range(3000, 9000)))
+    union = HyperLogLog(12).update(pd.Series(range(0, 9000)))
+    np.testing.assert_array_equal(a.merge(b).registers, union.registers)
+
+def test_frequent_items_merge_bounds():
+    rng = np.random.default_rng(0)
+    values = pd.Series(rng.zipf(1.5, 20_000) % 500)
+    chunks = np.array_split(values, 7)
+    sketch = FrequentItems(max_items=20).update(chunks[0])
+    for chunk in chunks[1:]:
+        sketch.merge(FrequentItems(max_items=20).update(chunk))
+
+    true_counts = values.value_counts()
+    assert sketch.error <= len(values) / (sketch.max_items + 1) * len(chunks)
+    for item, count in sketch.counts.items():
+        assert true_counts[item] - sketch.error <= count <= true_counts[item]
+    # Every item more frequent than the error bound is kept
+    for item in true_counts[true_counts > sketch.error].index:
+        assert item in sketch.counts.index
+    assert sketch.most_common() == true_counts.idxmax()
+
+def test_moments_merge_matches_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.normal(20000, 5000, 10_000)
+    moments = Moments()
+    for chunk in np.array_split(values, 13):
+        moments.merge(Moments().update(chunk))
+    assert moments.n == len(values)
+    assert moments.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert moments.std == pytest.approx(values.std(ddof=1), rel=1e-9)
+    assert (moments.min, moments.max) == (values.min(), values.max())
+
+def test_quantiles_within_relative_accuracy():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(10, 1, 50_000)
+    sketch = QuantileSketch(0.01).update(values[:20_000]).merge(QuantileSketch(0.01).update(values[20_000:]))
+    for q in (0.1, 0.5, 0.95):
+        exact = np.quantile(values, q, method='lower')
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.011)
+
+def test_summary_matches_exact_analyses(clean_prices, tmp_path):
+    exact = analyze_data.generate_summary_stats(clean_prices)
+    path = tmp_path / 'clean_data.parquet'
+    clean_prices.to_parquet(path, index=False, row_group_size=500)
+    for sketch in (summarize_frame(clean_prices, chunk_size=700), summarize_parquet(str(path), n_jobs=2)):
+        summary = sketch.summary_stats()
+        assert sketch.rows == len(clean_prices)
+        assert summary['total_models'] == exact['total_models']
+        assert summary['avg_price_eur'] == pytest.approx(exact['avg_price_eur'], abs=0.01)
+        assert summary['price_range_eur'] == exact['price_range_eur']
+        assert summary['most_common_collection'] == exact['most_common_collection']
+        pd.testing.assert_frame_equal(sketch.collection_stats(), analyze_data.analyze_collections(clean_prices),
+                                      check_dtype=False)